@@ -0,0 +1,157 @@
+import argparse
+import csv
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+# Keep pygame's import banner out of the CSV on stdout
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import working_survival_game as game
+
+# Module-level settings a batch may override per episode
+TUNABLE_PARAMETERS = ("INITIAL_STEP_SPEED", "MAX_STEP_SPEED", "STEP_SPAWN_RATE", "GRAB_DISTANCE")
+DEFAULT_PARAMETERS = {name: getattr(game, name) for name in TUNABLE_PARAMETERS}
+RESULT_FIELDS = (["episode", "seed", "policy"] + list(TUNABLE_PARAMETERS) +
+                 ["score", "survival_frames", "frames", "cause", "fps"])
+
+def climbing_bot(sim):
+    # Scripted player: hop down onto the highest step it can still reach,
+    # climb whenever it is hanging from one
+    player = sim.player
+    if player is None or sim.game_state != "playing":
+        return 0
+    if player.grabbing:
+        return game.BUTTON_UP
+    feet = player.y + player.height
+    center_x = player.x + player.width / 2
+    standing = player.on_ground and sim.last_step_landed
+    target = None
+    camera_y = sim.steps.camera_y
+    for step in sim.steps.near(feet + 1, game.SCREEN_HEIGHT - game.STEP_HEIGHT):
+        # Horizontal distance the player can cover while falling that far
+        reach = game.MOVE_SPEED * math.sqrt(2 * (step.y - camera_y - feet) / game.GRAVITY)
+        left, right = player.x, player.x + player.width
+        if standing:
+            left, right = standing.x - player.width, standing.x + standing.width
+        gap = max(step.x - right, left - (step.x + step.width), 0)
+        if gap < reach:
+            target = step
+            break
+    if target is None:
+        return 0
+    target_x = target.x + target.width / 2
+    if target_x < center_x - 5:
+        return game.BUTTON_LEFT
+    if target_x > center_x + 5:
+        return game.BUTTON_RIGHT
+    return 0
+
+def random_policy(seed):
+    rng = random.Random(seed)
+    choices = [0, game.BUTTON_LEFT, game.BUTTON_RIGHT, game.BUTTON_UP,
+               game.BUTTON_LEFT | game.BUTTON_UP, game.BUTTON_RIGHT | game.BUTTON_UP]
+    return lambda sim: rng.choice(choices)
+
+# Policy name -> factory taking the episode seed
+POLICIES = {
+    "climber": lambda seed: climbing_bot,
+    "random": random_policy,
+    "idle": lambda seed: (lambda sim: 0),
+}
+
+def run_episode(episode):
+    episode_id, seed, parameters, policy_name, max_frames = episode
+    # Workers are reused, so reset every tunable before applying this set
+    for name, value in DEFAULT_PARAMETERS.items():
+        setattr(game, name, parameters.get(name, value))
+    policy = POLICIES[policy_name](seed)
+
+    sim = game.Simulation(seed=seed, input_provider=game.ScriptedInput(policy))
+    sim.reset_game()
+    frames = 0
+    start = time.perf_counter()
+    while sim.game_state != "game_over" and frames < max_frames:
+        sim.step()
+        frames += 1
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "episode": episode_id,
+        "seed": seed,
+        "policy": policy_name,
+        "score": sim.score,
+        "survival_frames": sim.game_time,
+        "frames": frames,
+        "cause": "fell" if sim.game_state == "game_over" else "max_frames",
+        "fps": frames / elapsed if elapsed > 0 else 0.0,
+    }
+    for name in TUNABLE_PARAMETERS:
+        result[name] = getattr(game, name)
+    return result
+
+def build_episodes(episodes_per_set, base_seed, grid, policy, max_frames):
+    # One entry per (parameter set, seed); grid maps a name to its values
+    names = sorted(grid)
+    parameter_sets = [dict(zip(names, values))
+                      for values in itertools.product(*(grid[name] for name in names))]
+    episodes = []
+    for parameters in parameter_sets:
+        for i in range(episodes_per_set):
+            episodes.append((len(episodes), base_seed + i, parameters, policy, max_frames))
+    return episodes
+
+def run_batch(episodes, workers=None):
+    # Yields results as episodes finish, in completion order
+    if workers == 1:
+        for episode in episodes:
+            yield run_episode(episode)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(run_episode, episodes, chunksize=1):
+            yield result
+
+def parse_grid(settings):
+    grid = {}
+    for setting in settings:
+        name, _, values = setting.partition("=")
+        if name not in TUNABLE_PARAMETERS or not values:
+            raise SystemExit(f"--set expects NAME=v1,v2,... with NAME one of {', '.join(TUNABLE_PARAMETERS)}")
+        grid[name] = [float(value) if "." in value else int(value) for value in values.split(",")]
+    return grid
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless Q JUMP episodes across a process pool")
+    parser.add_argument("--episodes", type=int, default=100, help="episodes per parameter set")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first episode in each set")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="climber")
+    parser.add_argument("--max-frames", type=int, default=36000, help="frame cap per episode")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=V1,V2",
+                        help="sweep a tunable over these values (repeatable)")
+    parser.add_argument("--output", help="CSV file for results (default: stdout)")
+    args = parser.parse_args()
+
+    episodes = build_episodes(args.episodes, args.seed, parse_grid(args.set), args.policy, args.max_frames)
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    writer = csv.DictWriter(out, fieldnames=RESULT_FIELDS)
+    writer.writeheader()
+
+    total_frames = 0
+    start = time.perf_counter()
+    for result in run_batch(episodes, args.workers):
+        writer.writerow(result)
+        out.flush()
+        total_frames += result["frames"]
+    elapsed = time.perf_counter() - start
+    if out is not sys.stdout:
+        out.close()
+    print(f"{len(episodes)} episodes, {total_frames} frames in {elapsed:.1f}s "
+          f"({total_frames / elapsed:.0f} frames/s overall)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
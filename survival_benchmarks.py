@@ -0,0 +1,419 @@
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# Benchmarks run without a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+import working_survival_game as game
+from survival_batch_runner import climbing_bot
+
+STEP_COUNTS = (10, 100, 1000)
+DEFAULT_SAMPLES = 500
+STARTUP_RUNS = 5  # Fresh interpreters timed per startup benchmark
+MEMORY_ENTITIES = 10000  # Entities allocated per memory benchmark
+ALLOC_CHECK_FRAMES = 10000  # Steady-state frames traced by the allocation check
+ALLOC_WARMUP_FRAMES = 1200  # Frames played first so caches and buffers fill
+ALLOC_CHECK_SEED = 0  # Game the allocation check plays, so every run traces the same frames
+ALLOC_NET_LIMIT = 4.0  # Lasting growth allowed, bytes per frame
+ALLOC_NET_ALLOWANCE = 32768  # One-off growth allowed over the whole span (rewind keyframes, sprite cache)
+ALLOC_TRANSIENT_LIMIT = 1024.0  # Mean peak of short-lived allocations, bytes per frame
+RENDER_SCALES = (1.0, 0.75, 0.5, 0.25)  # Render surface sizes timed, relative to the window
+RESCENE_EVERY = 50  # Rebuild the scene this often so step counts stay fixed
+REGRESSION_TOLERANCE = 0.10  # Slower than baseline by more than this is flagged
+
+def time_calls(fn, calls, setup=None, setup_every=0):
+    # Per-call wall times; setup runs untimed before the first call and
+    # then every setup_every calls
+    samples = []
+    for i in range(calls):
+        if setup is not None and (i == 0 or (setup_every and i % setup_every == 0)):
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def summarize(samples):
+    ordered = sorted(samples)
+    median = ordered[len(ordered) // 2]
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return median * 1e6, p99 * 1e6
+
+def report(results, name, samples):
+    median, p99 = summarize(samples)
+    results[name] = {"median_us": median, "p99_us": p99}
+    print(f"{name:<40} median {median:9.2f} us   p99 {p99:9.2f} us")
+    return median, p99
+
+def report_memory(results, name, size):
+    results[name] = {"bytes_per_entity": size}
+    print(f"{name:<40} {size:9.1f} bytes per entity")
+
+def bytes_per_entity(make, count=MEMORY_ENTITIES):
+    # Traced heap growth per entity, attribute values included, not
+    # counting the list that holds them
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    entities = [make(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before - sys.getsizeof(entities)) / count
+
+def build_scene(g, step_count):
+    # A running game with step_count steps spread evenly down the screen
+    # and the player standing on a wide floor step at the bottom
+    g.reset_game()
+    g.game_state = "playing"
+    g.plane.active = False
+    g.steps.clear()
+    spacing = (game.SCREEN_HEIGHT - 40) / step_count
+    for i in range(step_count):
+        column = i % game.STEP_COLUMNS
+        # Same width ranges per type as StepGenerator.plan_step
+        step_type = game.STEP_TYPES[i % len(game.STEP_TYPES)]
+        if step_type == "easy":
+            width = 120 + (i * 7) % 41
+        elif step_type == "normal":
+            width = 80 + (i * 7) % 41
+        else:
+            width = 50 + (i * 7) % 31
+        if column == 0:
+            x = 50
+        elif column == 1:
+            x = game.SCREEN_WIDTH // 2 - width // 2
+        else:
+            x = game.SCREEN_WIDTH - 50 - width
+        g.steps.spawn(x, 20 + i * spacing, width, column, step_type)
+    floor = g.steps.spawn(game.SCREEN_WIDTH // 2 - 100, game.SCREEN_HEIGHT - 20, 200, 1, "easy")
+    g.player = game.Player(floor.x + 90, floor.y - 45)
+    g.player.on_ground = True
+    g.last_step_landed = floor
+
+def bench_player_draw(results, screen, calls):
+    # Cycle through every state, frame and facing so both paths draw the same mix
+    player = game.Player(400, 300)
+    poses = [(state, frame, facing_right)
+             for state in game.PLAYER_STATES
+             for frame in range(game.PLAYER_ANIMATION_FRAMES)
+             for facing_right in (True, False)]
+    pose_index = [0]
+    def next_pose():
+        player.state, player.animation_frame, player.facing_right = poses[pose_index[0] % len(poses)]
+        pose_index[0] += 1
+    def primitive():
+        next_pose()
+        player.draw_primitives(screen)
+    def atlas():
+        next_pose()
+        player.draw(screen)
+    game.player_atlas.build()  # Build outside the timed loop
+    primitive_median, _ = report(results, "Player.draw_primitives", time_calls(primitive, calls))
+    atlas_median, _ = report(results, "Player.draw (atlas)", time_calls(atlas, calls))
+    print(f"{'atlas speedup':<40} {primitive_median / atlas_median:.1f}x")
+
+def bench_hot_functions(results, g, samples):
+    step = game.Step(300, 300, 120, 1, "normal")
+    report(results, "Step.draw", time_calls(lambda: step.draw(g.screen), samples))
+    report(results, "Game.draw_background", time_calls(g.draw_background, samples))
+
+    generator = game.StepGenerator()
+    store = [None]
+    def fresh_store():
+        store[0] = g.step_store()
+    report(results, "StepGenerator.spawn_step",
+           time_calls(lambda: generator.spawn_step(store[0], generator.plan_step(5000)),
+                      samples, fresh_store, 1000))
+
+    build_scene(g, 10)
+    snapshot = g.snapshot()
+    report(results, "Simulation.snapshot (10 steps)", time_calls(g.snapshot, samples))
+    report(results, "Simulation.restore (10 steps)", time_calls(lambda: g.restore(snapshot), samples))
+
+    for count in STEP_COUNTS:
+        report(results, f"Player.update ({count} steps)",
+               time_calls(lambda: g.player.update(g.steps, 0), samples,
+                          lambda: build_scene(g, count), RESCENE_EVERY))
+    for count in STEP_COUNTS:
+        # Small enough that no step scrolls off between rebuilds
+        report(results, f"steps.scroll ({count} steps)",
+               time_calls(lambda: g.steps.scroll(0.01), samples,
+                          lambda: build_scene(g, count), RESCENE_EVERY))
+
+# The entity layouts from before __slots__, kept as the "before" side of
+# the memory benchmarks: every attribute, shared ones included, lives in a
+# per-instance __dict__
+class DictStep:
+    def __init__(self, x, y, width, column, step_type="normal"):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = game.STEP_HEIGHT
+        self.column = column
+        self.step_type = step_type
+        self.color = game.STEP_COLORS[step_type]
+
+class DictPlayer:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.prev_x = x
+        self.prev_y = y
+        self.width = 25
+        self.height = 45
+        self.vel_x = 0
+        self.vel_y = 0
+        self.on_ground = False
+        self.grabbing = False
+        self.grab_step = None
+        self.facing_right = True
+        self.animation_frame = 0
+        self.animation_timer = 0
+        self.state = "idle"
+
+class DictPlane:
+    def __init__(self):
+        self.x = -120
+        self.prev_x = self.x
+        self.y = 80
+        self.width = 80
+        self.height = 30
+        self.speed = 2.5
+        self.active = False
+        self.player_dropped = False
+
+def bench_memory(results):
+    for name, before, after in (
+            ("Step", lambda i: DictStep(50.0 + i % 600, i * 0.5, 120, i % 3, "easy"),
+             lambda i: game.Step(50.0 + i % 600, i * 0.5, 120, i % 3, "easy")),
+            ("Player", lambda i: DictPlayer(i * 0.5, i * 0.25), lambda i: game.Player(i * 0.5, i * 0.25)),
+            ("Plane", lambda i: DictPlane(), lambda i: game.Plane())):
+        report_memory(results, f"memory: {name} (dict, before)", bytes_per_entity(before))
+        report_memory(results, f"memory: {name}", bytes_per_entity(after))
+    if game.numpy is not None:
+        # Rows only: steps in an ArrayStepStore have no objects until viewed
+        def fill_store(count):
+            store = game.ArrayStepStore(count)
+            for i in range(count):
+                store.spawn(50.0 + i % 600, i * 0.5, 120, i % 3, "easy")
+            store.views.clear()
+            return store
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        store = fill_store(MEMORY_ENTITIES)
+        size = (tracemalloc.get_traced_memory()[0] - before) / MEMORY_ENTITIES
+        tracemalloc.stop()
+        del store
+        report_memory(results, "memory: ArrayStepStore row", size)
+
+def bench_frames(results, g, samples):
+    for count in STEP_COUNTS:
+        def setup():
+            build_scene(g, count)
+        report(results, f"Game.update ({count} steps)",
+               time_calls(g.update, samples, setup, RESCENE_EVERY))
+        report(results, f"Game.draw ({count} steps)",
+               time_calls(g.draw, samples, setup, RESCENE_EVERY))
+
+def bench_render_scales(results, samples):
+    # Draw time of the same 10-step scene at each render surface
+    # resolution, then what pygame.transform.scale adds to stretch the
+    # frame over the window. With pygame.SCALED the stretch is SDL's
+    # instead, on the GPU where the renderer has one.
+    for scale in RENDER_SCALES:
+        g = game.Game(render_scale=scale)
+        width, height = g.screen.get_size()
+        report(results, f"Game.render at {width}x{height}",
+               time_calls(g.render, samples, lambda: build_scene(g, 10), RESCENE_EVERY))
+        if g.screen is not g.window:
+            report(results, f"stretch {width}x{height} to window",
+                   time_calls(lambda: pygame.transform.scale(g.screen, g.window.get_size(), g.window),
+                              samples))
+
+# Startup probes run in a fresh interpreter so imports and subsystem init
+# count; each prints seconds since just before the game module import
+FIRST_TICK_PROBE = """
+import time
+start = time.perf_counter()
+import working_survival_game as game
+sim = game.Simulation(seed=0)
+sim.reset_game()
+sim.update()
+print(time.perf_counter() - start)
+"""
+FIRST_FRAME_PROBE = """
+import time
+start = time.perf_counter()
+import working_survival_game as game
+g = game.Game(seed=0)
+g.render()
+g.present()
+print(time.perf_counter() - start)
+"""
+
+def time_startup(probe, runs):
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", probe], cwd=here, check=True,
+                                capture_output=True, text=True).stdout
+        samples.append(float(output.split()[-1]))
+    return samples
+
+def bench_startup(results, runs):
+    report(results, "startup: first simulated tick", time_startup(FIRST_TICK_PROBE, runs))
+    report(results, "startup: first frame", time_startup(FIRST_FRAME_PROBE, runs))
+
+def check_frame_allocations(results, g, frames):
+    # Traces full "playing" frames (tick, render, present) after a warm-up
+    # and checks they neither leave memory behind nor churn through much.
+    # A climbing bot plays, its input worked out outside the traced span;
+    # when it dies the game is restored to the warmed-up state and that
+    # frame is not counted. The game is seeded so the same build always
+    # gives the same numbers.
+    buttons = game.ActionInput()
+    g.input = buttons
+    seed = g.seed
+    g.seed = ALLOC_CHECK_SEED
+    g.reset_game()
+    g.seed = seed
+    while g.game_state != "playing":
+        g.step()
+    for _ in range(ALLOC_WARMUP_FRAMES):
+        buttons.buttons = climbing_bot(g)
+        g.step()
+        g.render()
+        g.present()
+        if g.game_state != "playing":
+            raise RuntimeError("the bot died during the allocation check warm-up")
+    warmed_up = g.snapshot()
+
+    net = 0
+    transient = 0
+    worst = 0
+    counted = 0
+    collections = sum(stats["collections"] for stats in gc.get_stats())
+    tracemalloc.start()
+    for _ in range(frames):
+        if g.game_state != "playing":
+            g.restore(warmed_up)
+            continue
+        buttons.buttons = climbing_bot(g)
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        g.step()
+        g.render()
+        g.present()
+        current, peak = tracemalloc.get_traced_memory()
+        net += current - before
+        transient += peak - before
+        worst = max(worst, peak - before)
+        counted += 1
+    tracemalloc.stop()
+    collections = sum(stats["collections"] for stats in gc.get_stats()) - collections
+
+    net_per_frame = net / counted
+    transient_per_frame = transient / counted
+    results["alloc: net growth"] = {"bytes_per_frame": net_per_frame}
+    results["alloc: transient peak"] = {"bytes_per_frame": transient_per_frame}
+    print(f"{'alloc: frames traced':<40} {counted:9d}")
+    print(f"{'alloc: net growth':<40} {net_per_frame:9.1f} bytes per frame")
+    print(f"{'alloc: transient peak':<40} {transient_per_frame:9.1f} bytes per frame   max {worst} bytes")
+    print(f"{'alloc: gc collections':<40} {collections:9d}")
+    failures = []
+    # Bounded caches and buffers can still grow past the warm-up; only what
+    # goes beyond that allowance counts against the per-frame limit, so a
+    # short run is not failed for a one-off fill
+    if (net - ALLOC_NET_ALLOWANCE) / counted > ALLOC_NET_LIMIT:
+        failures.append(f"net growth {net_per_frame:.1f} > {ALLOC_NET_LIMIT} bytes per frame "
+                        f"after a {ALLOC_NET_ALLOWANCE} byte allowance")
+    if transient_per_frame > ALLOC_TRANSIENT_LIMIT:
+        failures.append(f"transient peak {transient_per_frame:.1f} > {ALLOC_TRANSIENT_LIMIT} bytes per frame")
+    for failure in failures:
+        print(f"ALLOCATION CHECK FAILED: {failure}")
+    return not failures
+
+def report_step_pool(results):
+    pool = game.step_pool
+    results["step pool: hit rate"] = {"ratio": pool.hit_rate()}
+    print(f"{'step pool: hit rate':<40} {pool.hit_rate():9.1%}   "
+          f"({pool.hits} reused, {pool.misses} allocated)")
+    print(f"{'step pool: size / high-water':<40} {pool.size():9d} / {pool.high_water}")
+
+def report_hud_cache(results, hud):
+    # Text and counter lookups over every frame drawn above
+    results["hud cache: hit rate"] = {"ratio": hud.hit_rate()}
+    print(f"{'hud cache: hit rate':<40} {hud.hit_rate():9.1%}   "
+          f"({hud.hits} hits, {hud.misses} rendered)")
+
+def compare(results, baseline, tolerance):
+    # Returns the names whose median got slower than the baseline allows
+    regressions = []
+    print()
+    print(f"{'vs baseline':<40} {'now':>10} {'baseline':>10} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        metric = next((key for key in ("median_us", "bytes_per_entity", "bytes_per_frame") if key in result), None)
+        if metric is None:
+            continue
+        before = baseline[name][metric]
+        after = result[metric]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<40} {after:10.2f} {before:10.2f} {change:+8.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame-time micro-benchmarks for the update and draw paths")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES, help="timed calls per benchmark")
+    parser.add_argument("--startup-runs", type=int, default=STARTUP_RUNS,
+                        help="fresh interpreters timed for the startup benchmarks (0 skips them)")
+    parser.add_argument("--alloc-frames", type=int, default=ALLOC_CHECK_FRAMES,
+                        help="steady-state frames traced by the allocation check (0 skips it)")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write results to a JSON baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a saved JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                        help="allowed median slowdown before flagging a regression")
+    args = parser.parse_args()
+
+    g = game.Game()
+    results = {}
+    if args.startup_runs:
+        bench_startup(results, args.startup_runs)
+    bench_memory(results)
+    bench_player_draw(results, g.screen, args.samples * 10)
+    bench_hot_functions(results, g, args.samples)
+    bench_frames(results, g, args.samples)
+    allocations_ok = True
+    if args.alloc_frames:
+        allocations_ok = check_frame_allocations(results, g, args.alloc_frames)
+    report_step_pool(results)
+    report_hud_cache(results, g.hud)
+    bench_render_scales(results, args.samples)
+    pygame.quit()
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0 if allocations_ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+import argparse
+import os
+import sys
+import time
+
+# Keep pygame's import banner out of agent and benchmark output
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy
+
+import working_survival_game as game
+
+NEARBY_STEPS = 4  # Steps around the player included in each observation
+NEARBY_ABOVE = 150  # How far above the player's feet steps are looked for
+PLAYER_FEATURES = ("x", "y", "vel_x", "vel_y", "on_ground", "grabbing", "step_speed")
+STEP_FEATURES = ("dx", "dy", "width")  # Step centre relative to the player's feet
+OBSERVATION_SIZE = len(PLAYER_FEATURES) + NEARBY_STEPS * len(STEP_FEATURES)
+INTRO_FRAME_LIMIT = 1000  # The plane drop takes about 250 frames
+
+class VectorEnv:
+    # N independent games stepped in lockstep. Actions, observations,
+    # rewards and done flags are NumPy arrays with one row per game; each
+    # game reads its buttons from its slot of the shared action array
+    # through a BatchActionInput. Episodes start after the plane intro and
+    # games that end are reset straight away, so every step() returns the
+    # first observation of the next episode for them. The returned arrays
+    # are reused by the next call; copy them to keep them.
+    def __init__(self, num_envs, seed=0, step_store=game.StepIndex):
+        self.num_envs = num_envs
+        self.seed = seed
+        self.step_store = step_store
+        self.actions = numpy.zeros(num_envs, dtype=numpy.uint8)
+        self.observations = numpy.zeros((num_envs, OBSERVATION_SIZE), dtype=numpy.float32)
+        self.rewards = numpy.zeros(num_envs, dtype=numpy.float32)
+        self.dones = numpy.zeros(num_envs, dtype=bool)
+        self.episode_scores = numpy.zeros(num_envs, dtype=numpy.int32)  # Final score of games ended this step
+        self.episode_frames = numpy.zeros(num_envs, dtype=numpy.int32)
+        self.episodes_started = 0
+        self.sims = [game.Simulation(step_store, input_provider=game.BatchActionInput(self.actions, i))
+                     for i in range(num_envs)]
+    def reset(self):
+        self.episodes_started = 0
+        for i in range(self.num_envs):
+            self.reset_env(i)
+            self.observe(i)
+        return self.observations
+    def reset_env(self, i):
+        # Each episode gets the next seed in sequence, so a run is
+        # reproducible from the VectorEnv seed alone
+        sim = self.sims[i]
+        sim.seed = self.seed + self.episodes_started
+        self.episodes_started += 1
+        sim.reset_game()
+        action = self.actions[i]
+        self.actions[i] = 0
+        frames = 0
+        while sim.game_state == "intro" and frames < INTRO_FRAME_LIMIT:
+            sim.step()
+            frames += 1
+        self.actions[i] = action
+        self.episode_frames[i] = 0
+    def step(self, actions):
+        # actions: one button bitmask per game
+        self.actions[:] = actions
+        rewards = self.rewards
+        dones = self.dones
+        for i, sim in enumerate(self.sims):
+            score = sim.score
+            sim.step()
+            self.episode_frames[i] += 1
+            rewards[i] = sim.score - score
+            done = sim.player.y > game.SCREEN_HEIGHT
+            dones[i] = done
+            if done:
+                self.episode_scores[i] = sim.score
+                self.reset_env(i)
+            self.observe(i)
+        return self.observations, rewards, dones
+    def observe(self, i):
+        sim = self.sims[i]
+        player = sim.player
+        feet_x = player.x + player.width / 2
+        feet_y = player.y + player.height
+        row = [player.x, player.y, player.vel_x, player.vel_y,
+               player.on_ground, player.grabbing, sim.step_speed]
+        found = 0
+        camera_y = sim.steps.camera_y
+        for step in sim.steps.near(feet_y - NEARBY_ABOVE, game.SCREEN_HEIGHT):
+            row.append(step.x + step.width / 2 - feet_x)
+            row.append(step.y - camera_y - feet_y)
+            row.append(step.width)
+            found += 1
+            if found == NEARBY_STEPS:
+                break
+        # Missing steps read as zero-width steps at the player's feet
+        row.extend((0.0,) * ((NEARBY_STEPS - found) * len(STEP_FEATURES)))
+        self.observations[i] = row
+
+def random_actions(rng, count):
+    choices = numpy.array([0, game.BUTTON_LEFT, game.BUTTON_RIGHT, game.BUTTON_UP,
+                           game.BUTTON_LEFT | game.BUTTON_UP, game.BUTTON_RIGHT | game.BUTTON_UP],
+                          dtype=numpy.uint8)
+    return choices[rng.integers(len(choices), size=count)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Step N headless Q JUMP games in lockstep and report throughput")
+    parser.add_argument("--envs", type=int, default=64, help="games stepped together")
+    parser.add_argument("--steps", type=int, default=2000, help="vector steps to run")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first episode")
+    parser.add_argument("--array-store", action="store_true", help="keep steps in an ArrayStepStore")
+    args = parser.parse_args()
+
+    step_store = game.ArrayStepStore if args.array_store else game.StepIndex
+    env = VectorEnv(args.envs, args.seed, step_store)
+    env.reset()
+    rng = numpy.random.default_rng(args.seed)
+    episodes = 0
+    total_reward = 0.0
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        _, rewards, dones = env.step(random_actions(rng, args.envs))
+        total_reward += float(rewards.sum())
+        episodes += int(dones.sum())
+    elapsed = time.perf_counter() - start
+    env_steps = args.envs * args.steps
+    print(f"{env_steps} env-steps in {elapsed:.2f}s ({env_steps / elapsed:.0f} env-steps/s), "
+          f"{episodes} episodes ended, {total_reward:.0f} total reward")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,26 @@
 import pygame
 import random
 import math
+import struct
 import sys
+import time
+import argparse
+import csv
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from operator import attrgetter
 
-# Initialize Pygame
-pygame.init()
-pygame.mixer.init()
+try:
+    import numpy
+except ImportError:  # Only ArrayStepStore needs it
+    numpy = None
 
 # Constants
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 700
 FPS = 60
+TICK_RATE = 60  # Simulation ticks per second; physics constants are per tick
+MAX_CATCHUP_TICKS = 5  # Ticks run per rendered frame before dropping time
 
 # Colors
 WHITE = (255, 255, 255)
@@ -23,6 +33,11 @@ RED = (255, 100, 100)
 YELLOW = (255, 255, 100)
 SKIN_COLOR = (255, 220, 177)
 LIGHT_BLUE = (200, 220, 255)
+STEP_COLORS = {
+    "easy": (101, 67, 33),  # Darker brown for easy steps
+    "normal": BROWN,
+    "small": (160, 82, 45),  # Lighter brown for small steps
+}
 
 # Game settings
 GRAVITY = 0.8
@@ -32,13 +47,102 @@ INITIAL_STEP_SPEED = 0.8
 MAX_STEP_SPEED = 4
 STEP_SPAWN_RATE = 120
 GRAB_DISTANCE = 50  # Increased grab distance
+STEP_HEIGHT = 20
+STEP_COLUMNS = 3  # Left wall, middle, right wall
+STEP_TYPES = ("easy", "normal", "small")
+STEP_SPRITE_CACHE_SIZE = 128  # Distinct (width, step_type) sprites kept
+HUD_GLYPHS = "0123456789.-"
+DIRTY_RECT_MAX_FRACTION = 0.5  # Flip the whole screen past this dirty area
+FRAME_PROFILE_SIZE = 600  # Frames of phase timings kept (10 seconds at 60 FPS)
+REWIND_SECONDS = 10  # Play kept for rewinding
+REWIND_KEYFRAME_INTERVAL = 30  # Ticks between full snapshots in the rewind buffer
+REWIND_SCRUB_SPEED = 2  # Ticks rewound per tick while the rewind key is held
+STEP_SCHEDULE_LOOKAHEAD = 8  # Upcoming steps StepGenerator plans ahead
+
+# Player sprite atlas layout
+PLAYER_STATES = ("idle", "running", "jumping", "grabbing")
+PLAYER_ANIMATION_FRAMES = 4
+PLAYER_SPRITE_PAD = 8  # Room for swinging limbs outside the hitbox
+PLAYER_ATLAS_COLORKEY = (255, 0, 255)
+
+# Input buttons (bitmask, so one frame of input fits in a byte)
+BUTTON_LEFT = 1
+BUTTON_RIGHT = 2
+BUTTON_UP = 4
+BUTTON_JUMP = 8
+
+def read_keyboard():
+    keys = pygame.key.get_pressed()
+    buttons = 0
+    if keys[pygame.K_LEFT]:
+        buttons |= BUTTON_LEFT
+    if keys[pygame.K_RIGHT]:
+        buttons |= BUTTON_RIGHT
+    if keys[pygame.K_UP]:
+        buttons |= BUTTON_UP
+    if keys[pygame.K_SPACE]:
+        buttons |= BUTTON_JUMP
+    return buttons
+
+# Input providers: anything with read(sim) returning the button bitmask for
+# the next tick can drive the player. Only KeyboardInput touches SDL.
+class NoInput:
+    def read(self, sim):
+        return 0
+
+class KeyboardInput:
+    # Needs a display and Game.handle_events pumping the event queue
+    def read(self, sim):
+        return read_keyboard()
+
+class ReplayInput:
+    # Plays back an InputRecording, then idles
+    def __init__(self, recording):
+        self.inputs = recording.inputs
+        self.position = 0
+    def finished(self):
+        return self.position >= len(self.inputs)
+    def read(self, sim):
+        if self.position >= len(self.inputs):
+            return 0
+        buttons = self.inputs[self.position]
+        self.position += 1
+        return buttons
+
+class ScriptedInput:
+    # Wraps a policy: a callable taking the simulation, returning buttons
+    def __init__(self, policy):
+        self.policy = policy
+    def read(self, sim):
+        return self.policy(sim)
+
+class ActionInput:
+    # Buttons set from outside (an agent) before each tick
+    def __init__(self, buttons=0):
+        self.buttons = buttons
+    def read(self, sim):
+        return self.buttons
+
+class BatchActionInput:
+    # One slot of a shared action buffer (a list or array, one entry per
+    # game) that a batched agent fills before stepping every game
+    def __init__(self, actions, index):
+        self.actions = actions
+        self.index = index
+    def read(self, sim):
+        return int(self.actions[self.index])
 
 class Player:
+    # Slots instead of a per-instance __dict__; the hitbox size is shared
+    __slots__ = ("x", "y", "prev_x", "prev_y", "vel_x", "vel_y", "on_ground", "grabbing",
+                 "grab_step", "facing_right", "animation_frame", "animation_timer", "state")
+    width = 25
+    height = 45
     def __init__(self, x, y):
         self.x = x
         self.y = y
-        self.width = 25
-        self.height = 45
+        self.prev_x = x
+        self.prev_y = y
         self.vel_x = 0
         self.vel_y = 0
         self.on_ground = False
@@ -48,18 +152,16 @@ class Player:
         self.animation_frame = 0
         self.animation_timer = 0
         self.state = "idle"
-    def update(self, steps):
-        # Handle input
-        keys = pygame.key.get_pressed()
-        
+    def update(self, steps, buttons=0, scrolled=0):
+        # scrolled: how far the steps rose since the last update
         if not self.grabbing:
             # Horizontal movement
-            if keys[pygame.K_LEFT]:
+            if buttons & BUTTON_LEFT:
                 self.vel_x = -MOVE_SPEED
                 self.facing_right = False
                 if self.on_ground:
                     self.state = "running"
-            elif keys[pygame.K_RIGHT]:
+            elif buttons & BUTTON_RIGHT:
                 self.vel_x = MOVE_SPEED
                 self.facing_right = True
                 if self.on_ground:
@@ -70,15 +172,15 @@ class Player:
                     self.state = "idle"
             
             # Jumping
-            if (keys[pygame.K_UP] or keys[pygame.K_SPACE]) and self.on_ground:
+            if buttons & (BUTTON_UP | BUTTON_JUMP) and self.on_ground:
                 self.vel_y = JUMP_STRENGTH
                 self.on_ground = False
                 self.state = "jumping"
                 
         else:
             # Climbing logic
-            if keys[pygame.K_UP]:
-                return self.climb_onto_step()
+            if buttons & BUTTON_UP:
+                return self.climb_onto_step(steps.camera_y)
         
         # Apply gravity
         if not self.grabbing:
@@ -93,7 +195,7 @@ class Player:
         self.x = max(0, min(SCREEN_WIDTH - self.width, self.x))
         
         # Check collisions with steps
-        landed_step = self.check_step_collisions(steps)
+        landed_step = self.check_step_collisions(steps, scrolled)
         
         # Check for grabbing opportunities (enhanced detection)
         if not self.on_ground and not self.grabbing and self.vel_y > 0:
@@ -103,29 +205,79 @@ class Player:
         self.update_animation()
         
         return landed_step
-    def check_step_collisions(self, steps):
-        player_rect = pygame.Rect(self.x, self.y, self.width, self.height)
+    def check_step_collisions(self, steps, scrolled=0):
         self.on_ground = False
+        # A fast fall or a long tick can carry the player across one step's
+        # top and on into another, so the sweep goes first: the earliest
+        # top crossed wins over whatever the player overlaps at the end
+        landed = self.sweep_step_collisions(steps, scrolled)
+        if landed is not None:
+            return landed
         
-        for step in steps:
-            step_rect = pygame.Rect(step.x, step.y, step.width, step.height)
+        # Overlap on whole pixels, truncated the way pygame.Rect would,
+        # without building Rects every tick
+        left = int(self.x)
+        top = int(self.y)
+        right = left + self.width
+        bottom = top + self.height
+        
+        # Only steps in the player's y-band can overlap (1px slack for the
+        # integer truncation). Steps are in world space, the player in
+        # screen space.
+        camera_y = steps.camera_y
+        for step in steps.near(self.y - STEP_HEIGHT - 1, self.y + self.height + 1):
+            screen_y = step.y - camera_y
+            step_left = int(step.x)
+            step_top = int(screen_y)
             
-            if player_rect.colliderect(step_rect) and self.vel_y >= 0:
+            if (left < step_left + step.width and step_left < right and
+                    top < step_top + step.height and step_top < bottom and self.vel_y >= 0):
                 # Landing on top of step
-                if self.y < step.y:
-                    self.y = step.y - self.height
+                if self.y < screen_y:
+                    self.y = screen_y - self.height
                     self.vel_y = 0
                     self.on_ground = True
                     self.state = "idle"
                     return step
         return None
+    def sweep_step_collisions(self, steps, scrolled):
+        # Swept AABB in the steps' frame: over the tick the feet moved from
+        # prev_y + height to y + height while every step rose by scrolled.
+        # A step is hit if the feet crossed its top while the player
+        # overlapped it horizontally; the earliest such step wins.
+        if self.vel_y < 0:
+            return None
+        feet_start = self.prev_y + self.height
+        feet_end = self.y + self.height
+        closing = feet_end - feet_start + scrolled  # Feet travel relative to the steps
+        if closing <= 0:
+            return None
+        camera_y = steps.camera_y
+        for step in steps.near(feet_start - scrolled, feet_end):
+            screen_y = step.y - camera_y
+            contact = (screen_y + scrolled - feet_start) / closing  # 0..1 through the tick
+            if contact <= 0:
+                # Feet already on this top when the tick began: standing,
+                # which the overlap check covers, not a landing
+                continue
+            x = self.prev_x + (self.x - self.prev_x) * contact
+            if x < step.x + step.width and x + self.width > step.x:
+                self.y = screen_y - self.height
+                self.vel_y = 0
+                self.on_ground = True
+                self.state = "idle"
+                return step
+        return None
     def check_grab_opportunities(self, steps):
         player_center_x = self.x + self.width / 2
         player_center_y = self.y + self.height / 2
         
-        for step in steps:
+        # A grab needs the step centre within 40px vertically
+        camera_y = steps.camera_y
+        for step in steps.near(player_center_y - 40 - STEP_HEIGHT, player_center_y + 40):
+            screen_y = step.y - camera_y
             step_center_x = step.x + step.width / 2
-            step_center_y = step.y + step.height / 2
+            step_center_y = screen_y + step.height / 2
             
             # Calculate distance to step
             distance = math.sqrt((player_center_x - step_center_x)**2 + 
@@ -139,7 +291,7 @@ class Player:
             if (distance < GRAB_DISTANCE and 
                 vertical_distance < 40 and 
                 horizontal_distance < step.width/2 + 25 and
-                self.y > step.y - 30):
+                self.y > screen_y - 30):
                 
                 self.grab_step = step
                 self.grabbing = True
@@ -148,11 +300,11 @@ class Player:
                 self.vel_y = 0
                 # Position player hanging from step
                 self.x = step.x + step.width/2 - self.width/2
-                self.y = step.y + step.height
+                self.y = screen_y + step.height
                 break
-    def climb_onto_step(self):
+    def climb_onto_step(self, camera_y=0):
         if self.grab_step:
-            self.y = self.grab_step.y - self.height
+            self.y = self.grab_step.y - camera_y - self.height
             self.grabbing = False
             self.on_ground = True
             self.state = "idle"
@@ -160,142 +312,538 @@ class Player:
             self.grab_step = None
             return climbed_step
         return None
+    def remember_position(self):
+        self.prev_x = self.x
+        self.prev_y = self.y
+    def render_position(self, alpha):
+        # Position between the last two ticks, for interpolated drawing
+        return (self.prev_x + (self.x - self.prev_x) * alpha,
+                self.prev_y + (self.y - self.prev_y) * alpha)
     def update_animation(self):
         self.animation_timer += 1
         if self.animation_timer >= 8:
-            self.animation_frame = (self.animation_frame + 1) % 4
+            self.animation_frame = (self.animation_frame + 1) % PLAYER_ANIMATION_FRAMES
             self.animation_timer = 0
-    def draw(self, screen):
-        # Human-like character sprite
-        
-        # Head
-        head_x = self.x + self.width//2
-        head_y = self.y + 8
-        pygame.draw.circle(screen, SKIN_COLOR, (int(head_x), int(head_y)), 8)
-        
-        # Eyes
-        eye_offset = 3 if self.facing_right else -3
-        pygame.draw.circle(screen, BLACK, (int(head_x + eye_offset), int(head_y - 2)), 2)
-        
-        # Body
-        body_color = GREEN
-        if self.state == "jumping":
-            body_color = YELLOW
-        elif self.state == "grabbing":
-            body_color = RED
-        elif self.state == "running":
-            body_color = BLUE
-            
-        pygame.draw.rect(screen, body_color, (self.x + 5, self.y + 16, self.width - 10, 20))
-        
-        # Arms
-        arm_y = self.y + 20
-        if self.state == "grabbing":
-            # Arms reaching up
-            pygame.draw.line(screen, SKIN_COLOR, (self.x + 8, arm_y), (self.x + 3, self.y + 5), 4)
-            pygame.draw.line(screen, SKIN_COLOR, (self.x + self.width - 8, arm_y), 
-                           (self.x + self.width - 3, self.y + 5), 4)
-        elif self.state == "running":
-            # Swinging arms
-            arm_swing = math.sin(self.animation_frame * 0.8) * 8
-            pygame.draw.line(screen, SKIN_COLOR, (self.x + 8, arm_y), 
-                           (self.x + 8 + arm_swing, arm_y + 12), 4)
-            pygame.draw.line(screen, SKIN_COLOR, (self.x + self.width - 8, arm_y), 
-                           (self.x + self.width - 8 - arm_swing, arm_y + 12), 4)
-        else:
-            # Normal arms
-            pygame.draw.line(screen, SKIN_COLOR, (self.x + 8, arm_y), (self.x + 8, arm_y + 12), 4)
-            pygame.draw.line(screen, SKIN_COLOR, (self.x + self.width - 8, arm_y), 
-                           (self.x + self.width - 8, arm_y + 12), 4)
-        
-        # Legs
-        leg_y = self.y + 36
-        if self.state == "running":
-            # Running legs animation
-            leg_swing = math.sin(self.animation_frame) * 10
-            pygame.draw.line(screen, BLUE, (self.x + 8, leg_y), 
-                           (self.x + 8 + leg_swing, leg_y + 15), 4)
-            pygame.draw.line(screen, BLUE, (self.x + self.width - 8, leg_y), 
-                           (self.x + self.width - 8 - leg_swing, leg_y + 15), 4)
-        elif self.state == "jumping":
-            # Bent legs for jumping
-            pygame.draw.line(screen, BLUE, (self.x + 8, leg_y), (self.x + 12, leg_y + 10), 4)
-            pygame.draw.line(screen, BLUE, (self.x + self.width - 8, leg_y), 
-                           (self.x + self.width - 12, leg_y + 10), 4)
-        else:
-            # Standing legs
-            pygame.draw.line(screen, BLUE, (self.x + 8, leg_y), (self.x + 8, leg_y + 15), 4)
-            pygame.draw.line(screen, BLUE, (self.x + self.width - 8, leg_y), 
-                           (self.x + self.width - 8, leg_y + 15), 4)
+    def draw(self, screen, alpha=1.0, scale=1.0):
+        x, y = self.render_position(alpha)
+        sprite = player_atlas.get(self.state, self.animation_frame, self.facing_right, scale)
+        return screen.blit(sprite, ((x - PLAYER_SPRITE_PAD) * scale, (y - PLAYER_SPRITE_PAD) * scale))
+    def draw_primitives(self, screen):
+        draw_player_figure(screen, self.x, self.y, self.width, self.state,
+                           self.animation_frame, self.facing_right)
+
+def scale_length(length, scale):
+    # A size on a render surface scale times the screen's, never vanishing
+    return max(1, round(length * scale))
+
+def scale_rect(rect, scale):
+    # Positions truncate the way pygame treats float rects
+    x, y, width, height = rect
+    return pygame.Rect(int(x * scale), int(y * scale),
+                       scale_length(width, scale), scale_length(height, scale))
+
+def draw_player_figure(surface, x, y, width, state, animation_frame, facing_right):
+    # Human-like character sprite
+    
+    # Head
+    head_x = x + width//2
+    head_y = y + 8
+    pygame.draw.circle(surface, SKIN_COLOR, (int(head_x), int(head_y)), 8)
+    
+    # Eyes
+    eye_offset = 3 if facing_right else -3
+    pygame.draw.circle(surface, BLACK, (int(head_x + eye_offset), int(head_y - 2)), 2)
+    
+    # Body
+    body_color = GREEN
+    if state == "jumping":
+        body_color = YELLOW
+    elif state == "grabbing":
+        body_color = RED
+    elif state == "running":
+        body_color = BLUE
+        
+    pygame.draw.rect(surface, body_color, (x + 5, y + 16, width - 10, 20))
+    
+    # Arms
+    arm_y = y + 20
+    if state == "grabbing":
+        # Arms reaching up
+        pygame.draw.line(surface, SKIN_COLOR, (x + 8, arm_y), (x + 3, y + 5), 4)
+        pygame.draw.line(surface, SKIN_COLOR, (x + width - 8, arm_y), 
+                       (x + width - 3, y + 5), 4)
+    elif state == "running":
+        # Swinging arms
+        arm_swing = math.sin(animation_frame * 0.8) * 8
+        pygame.draw.line(surface, SKIN_COLOR, (x + 8, arm_y), 
+                       (x + 8 + arm_swing, arm_y + 12), 4)
+        pygame.draw.line(surface, SKIN_COLOR, (x + width - 8, arm_y), 
+                       (x + width - 8 - arm_swing, arm_y + 12), 4)
+    else:
+        # Normal arms
+        pygame.draw.line(surface, SKIN_COLOR, (x + 8, arm_y), (x + 8, arm_y + 12), 4)
+        pygame.draw.line(surface, SKIN_COLOR, (x + width - 8, arm_y), 
+                       (x + width - 8, arm_y + 12), 4)
+    
+    # Legs
+    leg_y = y + 36
+    if state == "running":
+        # Running legs animation
+        leg_swing = math.sin(animation_frame) * 10
+        pygame.draw.line(surface, BLUE, (x + 8, leg_y), 
+                       (x + 8 + leg_swing, leg_y + 15), 4)
+        pygame.draw.line(surface, BLUE, (x + width - 8, leg_y), 
+                       (x + width - 8 - leg_swing, leg_y + 15), 4)
+    elif state == "jumping":
+        # Bent legs for jumping
+        pygame.draw.line(surface, BLUE, (x + 8, leg_y), (x + 12, leg_y + 10), 4)
+        pygame.draw.line(surface, BLUE, (x + width - 8, leg_y), 
+                       (x + width - 12, leg_y + 10), 4)
+    else:
+        # Standing legs
+        pygame.draw.line(surface, BLUE, (x + 8, leg_y), (x + 8, leg_y + 15), 4)
+        pygame.draw.line(surface, BLUE, (x + width - 8, leg_y), 
+                       (x + width - 8, leg_y + 15), 4)
+
+class PlayerAtlas:
+    # Every state x animation_frame x facing baked once into one atlas,
+    # then cut into per-pose sprites so drawing the player is one blit.
+    # Sprites for a lower render scale are shrunk from these on first use.
+    def __init__(self, width=25, height=45):
+        self.width = width
+        self.height = height
+        self.cell_width = width + PLAYER_SPRITE_PAD * 2
+        self.cell_height = height + PLAYER_SPRITE_PAD * 2
+        self.atlas = None
+        self.sprites = {}
+        self.scaled = {}
+    def build(self):
+        columns = PLAYER_ANIMATION_FRAMES
+        rows = len(PLAYER_STATES) * 2
+        atlas = pygame.Surface((self.cell_width * columns, self.cell_height * rows))
+        atlas.fill(PLAYER_ATLAS_COLORKEY)
+        cells = {}
+        row = 0
+        for state in PLAYER_STATES:
+            for facing_right in (True, False):
+                cell_y = row * self.cell_height
+                for frame in range(columns):
+                    cell_x = frame * self.cell_width
+                    draw_player_figure(atlas, cell_x + PLAYER_SPRITE_PAD, cell_y + PLAYER_SPRITE_PAD,
+                                       self.width, state, frame, facing_right)
+                    cells[(state, frame, facing_right)] = (cell_x, cell_y, self.cell_width, self.cell_height)
+                row += 1
+        self.atlas = atlas
+        # Standalone copies: an RLE colorkey blit of a whole small surface is
+        # much cheaper than alpha blending or clipping into the big atlas
+        converted = pygame.display.get_surface() is not None
+        self.sprites = {}
+        self.scaled = {}
+        for key, cell in cells.items():
+            sprite = atlas.subsurface(cell).copy()
+            if converted:
+                sprite = sprite.convert()
+            sprite.set_colorkey(PLAYER_ATLAS_COLORKEY, pygame.RLEACCEL)
+            self.sprites[key] = sprite
+    def get(self, state, animation_frame, facing_right, scale=1.0):
+        if self.atlas is None:
+            self.build()
+        if scale == 1.0:
+            return self.sprites[(state, animation_frame, facing_right)]
+        key = (state, animation_frame, facing_right, scale)
+        sprite = self.scaled.get(key)
+        if sprite is None:
+            # Nearest-neighbour keeps the colorkey exact at the edges
+            size = (scale_length(self.cell_width, scale), scale_length(self.cell_height, scale))
+            sprite = pygame.transform.scale(self.sprites[key[:3]], size)
+            sprite.set_colorkey(PLAYER_ATLAS_COLORKEY, pygame.RLEACCEL)
+            self.scaled[key] = sprite
+        return sprite
+
+player_atlas = PlayerAtlas()
 
 class Step:
+    # Slots instead of a per-instance __dict__: stress and batch runs hold
+    # a lot of steps. Height is shared and color comes from STEP_COLORS.
+    # y is in world space; steps never move, the camera scrolls past them.
+    __slots__ = ("x", "y", "width", "column", "step_type")
+    height = STEP_HEIGHT
     def __init__(self, x, y, width, column, step_type="normal"):
         self.x = x
         self.y = y
         self.width = width
-        self.height = 20
         self.column = column
         self.step_type = step_type
-        self.color = self.get_color()
     def get_color(self):
-        if self.step_type == "easy":
-            return (101, 67, 33)  # Darker brown for easy steps
-        elif self.step_type == "small":
-            return (160, 82, 45)  # Lighter brown for small steps
+        return STEP_COLORS[self.step_type]
+    color = property(get_color)
+    def draw(self, screen, offset_y=0, scale=1.0):
+        # offset_y takes world y to screen y; scale is the render surface's
+        # size relative to the screen
+        return screen.blit(step_sprites.get(self, scale), (self.x * scale, (self.y + offset_y) * scale))
+
+class StepSpriteCache:
+    # Pre-rendered step looks keyed by (width, step_type, scale), least
+    # recently used evicted first so memory stays bounded
+    def __init__(self, capacity=STEP_SPRITE_CACHE_SIZE):
+        self.capacity = capacity
+        self.sprites = OrderedDict()
+    def get(self, step, scale=1.0):
+        key = (step.width, step.step_type, scale)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.render(step, scale)
+            self.sprites[key] = sprite
+            if len(self.sprites) > self.capacity:
+                self.sprites.popitem(last=False)
         else:
-            return BROWN
-    def update(self, speed):
-        self.y -= speed
-    def draw(self, screen):
+            self.sprites.move_to_end(key)
+        return sprite
+    def clear(self):
+        self.sprites.clear()
+    def render(self, step, scale=1.0):
+        sprite = pygame.Surface((step.width, step.height))
         # Main step
-        pygame.draw.rect(screen, self.color, (self.x, self.y, self.width, self.height))
-        pygame.draw.rect(screen, BLACK, (self.x, self.y, self.width, self.height), 2)
+        sprite.fill(step.color)
+        pygame.draw.rect(sprite, BLACK, (0, 0, step.width, step.height), 2)
         
         # Add texture
-        for i in range(0, self.width, 15):
-            pygame.draw.line(screen, BLACK, (self.x + i, self.y), (self.x + i, self.y + self.height), 1)
+        for i in range(0, step.width, 15):
+            pygame.draw.line(sprite, BLACK, (i, 0), (i, step.height), 1)
+        if scale != 1.0:
+            sprite = pygame.transform.smoothscale(
+                sprite, (scale_length(step.width, scale), scale_length(step.height, scale)))
+        if pygame.display.get_surface() is not None:
+            sprite = sprite.convert()
+        return sprite
 
-class StepGenerator:
+step_sprites = StepSpriteCache()
+
+class StepPool:
+    # Despawned steps wait here to be reused by the next spawn, so a game
+    # at steady state stops allocating Step objects. live counts steps
+    # handed out and not yet released (steps in a store dropped without
+    # clear() never are); high_water is the most ever live at once.
+    def __init__(self):
+        self.free = []
+        self.hits = 0
+        self.misses = 0
+        self.live = 0
+        self.high_water = 0
+    def acquire(self, x, y, width, column, step_type):
+        if self.free:
+            self.hits += 1
+            step = self.free.pop()
+            step.x = x
+            step.y = y
+            step.width = width
+            step.column = column
+            step.step_type = step_type
+        else:
+            self.misses += 1
+            step = Step(x, y, width, column, step_type)
+        self.live += 1
+        if self.live > self.high_water:
+            self.high_water = self.live
+        return step
+    def release(self, step):
+        self.live -= 1
+        self.free.append(step)
+    def size(self):
+        return len(self.free)
+    def hit_rate(self):
+        acquired = self.hits + self.misses
+        return self.hits / acquired if acquired else 0.0
+
+step_pool = StepPool()
+
+step_y = attrgetter("y")
+
+# One planned spawn: the game_time it is due, and where and what it is
+ScheduledStep = namedtuple("ScheduledStep", "spawn_frame column width step_type x")
+
+# Columns a step may spawn in after one in the given column (-1: none yet)
+NEXT_COLUMNS = {-1: (0, 1, 2), 0: (1, 2), 1: (0, 2), 2: (0, 1)}
+
+class StepIndex:
+    # Live steps, kept in spawn order plus one y-ordered list per column.
+    # Steps sit still in world space while camera_y, the world y at the top
+    # of the screen, moves down past them: scrolling is one add. New steps
+    # spawn below the screen, so spawn order is y order and despawns always
+    # come off the front; collision and grab checks only binary-search the
+    # few steps in the player's y-band. Steps come from and go back to
+    # step_pool.
     def __init__(self):
-        self.spawn_timer = 0
+        self.steps = []
+        self.columns = [[] for _ in range(STEP_COLUMNS)]
+        self.found = []  # near() results, reused from call to call
+        self.camera_y = 0.0
+    def __iter__(self):
+        return iter(self.steps)
+    def __len__(self):
+        return len(self.steps)
+    def __getitem__(self, index):
+        return self.steps[index]
+    def spawn(self, x, y, width, column, step_type):
+        step = step_pool.acquire(x, y, width, column, step_type)
+        self.append(step)
+        return step
+    def append(self, step):
+        self.steps.append(step)
+        column = self.columns[step.column]
+        if column and column[-1].y > step.y:
+            column.insert(first_step_at_or_below(column, step.y), step)
+        else:
+            column.append(step)
+    def scroll(self, speed):
+        # Returns how many steps scrolled off the top and were despawned
+        self.camera_y += speed
+        steps = self.steps
+        top = self.camera_y - STEP_HEIGHT
+        culled = 0
+        for step in steps:
+            if step.y >= top:
+                break
+            culled += 1
+        if culled:
+            for i in range(culled):
+                step = steps[i]
+                self.columns[step.column].remove(step)
+                step_pool.release(step)
+            del steps[:culled]
+        return culled
+    def clear(self):
+        # Despawn every step
+        for step in self.steps:
+            step_pool.release(step)
+        self.steps.clear()
+        for column in self.columns:
+            column.clear()
+    def near(self, top, bottom):
+        # Steps whose top edge lies in [top, bottom] on screen, in y order.
+        # The list is reused by the next call, so use it before asking again.
+        found = self.found
+        found.clear()
+        top += self.camera_y
+        bottom += self.camera_y
+        for column in self.columns:
+            for i in range(first_step_at_or_below(column, top), len(column)):
+                step = column[i]
+                if step.y > bottom:
+                    break
+                found.append(step)
+        if len(found) > 1:
+            found.sort(key=step_y)
+        return found
+
+def first_step_at_or_below(column, y):
+    # Binary search for the first step whose y is >= the given y
+    low, high = 0, len(column)
+    while low < high:
+        mid = (low + high) // 2
+        if column[mid].y < y:
+            low = mid + 1
+        else:
+            high = mid
+    return low
+
+class ArrayStepStore:
+    # Struct-of-arrays step storage for stress and batch runs: culling is
+    # one binary search and one shift of the rows left. Step objects only
+    # exist as StepView windows, made when something asks for a step.
+    # Same interface as StepIndex, world-space rows included; needs numpy.
+    def __init__(self, capacity=64):
+        if numpy is None:
+            raise ImportError("ArrayStepStore requires numpy")
+        self.count = 0
+        self.next_uid = 0
+        self.x = numpy.zeros(capacity, dtype=numpy.float64)
+        self.y = numpy.zeros(capacity, dtype=numpy.float64)
+        self.width = numpy.zeros(capacity, dtype=numpy.int32)
+        self.column = numpy.zeros(capacity, dtype=numpy.int8)
+        self.step_type = numpy.zeros(capacity, dtype=numpy.int8)
+        self.uid = numpy.zeros(capacity, dtype=numpy.int64)
+        self.views = {}  # uid -> StepView, so a step keeps one identity
+        self.camera_y = 0.0
+    def __len__(self):
+        return self.count
+    def __iter__(self):
+        return iter([self.view(row) for row in range(self.count)])
+    def __getitem__(self, index):
+        row = range(self.count)[index]
+        return self.view(row)
+    def grow(self):
+        capacity = len(self.x) * 2
+        for name in ("x", "y", "width", "column", "step_type", "uid"):
+            old = getattr(self, name)
+            new = numpy.zeros(capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+    def spawn(self, x, y, width, column, step_type):
+        if self.count == len(self.x):
+            self.grow()
+        row = self.count
+        self.x[row] = x
+        self.y[row] = y
+        self.width[row] = width
+        self.column[row] = column
+        self.step_type[row] = STEP_TYPES.index(step_type)
+        self.uid[row] = self.next_uid
+        self.next_uid += 1
+        self.count += 1
+        return self.view(row)
+    def append(self, step):
+        self.spawn(step.x, step.y, step.width, step.column, step.step_type)
+    def view(self, row):
+        uid = int(self.uid[row])
+        view = self.views.get(uid)
+        if view is None:
+            view = StepView(self, row)
+            self.views[uid] = view
+        return view
+    def scroll(self, speed):
+        # Returns how many steps scrolled off the top and were despawned
+        self.camera_y += speed
+        count = self.count
+        culled = int(numpy.searchsorted(self.y[:count], self.camera_y - STEP_HEIGHT))
+        if not culled:
+            return 0
+        # Views of despawned steps keep their last values; live views
+        # follow their row to its shifted position
+        for uid, view in list(self.views.items()):
+            if view.row >= culled:
+                view.row -= culled
+            else:
+                view.detach()
+                del self.views[uid]
+        kept = count - culled
+        for name in ("x", "y", "width", "column", "step_type", "uid"):
+            array = getattr(self, name)
+            array[:kept] = array[culled:count]
+        self.count = kept
+        return culled
+    def clear(self):
+        # Despawn every step
+        for view in self.views.values():
+            view.detach()
+        self.views.clear()
+        self.count = 0
+    def near(self, top, bottom):
+        # Rows are in spawn order, which is also y order
+        y = self.y[:self.count]
+        rows = numpy.flatnonzero((y >= top + self.camera_y) & (y <= bottom + self.camera_y))
+        return [self.view(int(row)) for row in rows]
+
+class StepView:
+    # Step-like window onto one row of an ArrayStepStore
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+        self.height = STEP_HEIGHT
+        self.values = None
+    def detach(self):
+        self.values = (self.x, self.y, self.width, self.column, self.step_type)
+        self.store = None
+    @property
+    def x(self):
+        if self.store is None:
+            return self.values[0]
+        return float(self.store.x[self.row])
+    @property
+    def y(self):
+        if self.store is None:
+            return self.values[1]
+        return float(self.store.y[self.row])
+    @property
+    def width(self):
+        if self.store is None:
+            return self.values[2]
+        return int(self.store.width[self.row])
+    @property
+    def column(self):
+        if self.store is None:
+            return self.values[3]
+        return int(self.store.column[self.row])
+    @property
+    def step_type(self):
+        if self.store is None:
+            return self.values[4]
+        return STEP_TYPES[self.store.step_type[self.row]]
+    get_color = Step.get_color
+    color = property(Step.get_color)
+    draw = Step.draw
+
+class StepGenerator:
+    # Steps come from a schedule: plan_steps() lazily works out when each
+    # step spawns and its column, width and type, and at least the next
+    # `lookahead` plans wait in a queue. Planners and the renderer can
+    # peek() at upcoming steps without touching the RNG, and a frame only
+    # compares game_time with the head of the queue. The planner keeps its
+    # position in attributes, not generator locals, so it can resume from
+    # them.
+    def __init__(self, rng=None, lookahead=STEP_SCHEDULE_LOOKAHEAD):
+        self.rng = rng if rng is not None else random.Random()
+        self.lookahead = max(1, lookahead)
         self.difficulty = 1.0
         self.last_column = -1
+        self.planned_frame = 0  # Last game_time the planner has gone through
+        self.spawn_timer = 0  # Planner frames since the last planned spawn
+        self.upcoming = deque()
+        self.planner = self.plan_steps()
+        self.packed_rng = None  # (planned_frame, packed RNG state) cache
+        self.fill()
     def update(self, steps, game_time):
         # Progressive difficulty
         time_factor = min(game_time / 15000, 1.0)  # Max difficulty after 4 minutes
         self.difficulty = 1 + (time_factor * 2)
         
-        self.spawn_timer += 1
-        spawn_rate = max(40, int(STEP_SPAWN_RATE / self.difficulty))
-        
-        if self.spawn_timer >= spawn_rate:
-            self.spawn_step(steps, game_time)
-            self.spawn_timer = 0
-    def spawn_step(self, steps, game_time):
+        # Spawns are at least 40 frames apart, so at most one is due
+        if self.upcoming[0].spawn_frame <= game_time:
+            self.spawn_step(steps, self.upcoming.popleft())
+            if len(self.upcoming) < self.lookahead:
+                self.fill()
+    def fill(self):
+        # Plans are made in batches, topping the queue up to twice the
+        # lookahead, so the RNG (and the packed copy snapshots keep) only
+        # changes every `lookahead` spawns
+        while len(self.upcoming) < 2 * self.lookahead:
+            self.upcoming.append(next(self.planner))
+    def peek(self, count=None):
+        # The next planned steps, soonest first
+        if count is None or count >= len(self.upcoming):
+            return list(self.upcoming)
+        return [self.upcoming[i] for i in range(count)]
+    def plan_steps(self):
+        while True:
+            self.planned_frame += 1
+            self.spawn_timer += 1
+            # Spawn rate follows the difficulty at that frame
+            time_factor = min(self.planned_frame / 15000, 1.0)
+            spawn_rate = max(40, int(STEP_SPAWN_RATE / (1 + time_factor * 2)))
+            if self.spawn_timer >= spawn_rate:
+                self.spawn_timer = 0
+                yield self.plan_step(self.planned_frame)
+    def plan_step(self, spawn_frame):
         # Avoid same column consecutively
-        available_columns = [0, 1, 2]
-        if self.last_column != -1 and len(available_columns) > 1:
-            available_columns.remove(self.last_column)
-        
-        column = random.choice(available_columns)
+        column = self.rng.choice(NEXT_COLUMNS[self.last_column])
         self.last_column = column
         
         # Progressive step size difficulty - starts with 90% easy steps
-        time_factor = min(game_time / 15000, 1.0)
+        time_factor = min(spawn_frame / 15000, 1.0)
         easy_probability = 0.9 - (0.4 * time_factor)  # 90% to 50%
         
-        rand_val = random.random()
+        rand_val = self.rng.random()
         if rand_val < easy_probability:
             # Easy step (large)
-            step_width = random.randint(120, 160)
+            step_width = self.rng.randint(120, 160)
             step_type = "easy"
         elif rand_val < easy_probability + 0.3:
             # Normal step
-            step_width = random.randint(80, 120)
+            step_width = self.rng.randint(80, 120)
             step_type = "normal"
         else:
             # Small step (challenging)
-            step_width = random.randint(50, 80)
+            step_width = self.rng.randint(50, 80)
             step_type = "small"
         
         # Position based on column
@@ -304,19 +852,36 @@ class StepGenerator:
         elif column == 1:  # Middle
             base_x = SCREEN_WIDTH // 2 - step_width // 2
             variation = min(60, step_width // 4)
-            x = base_x + random.randint(-variation, variation)
+            x = base_x + self.rng.randint(-variation, variation)
             x = max(60, min(SCREEN_WIDTH - step_width - 60, x))
         else:  # Right wall
             x = SCREEN_WIDTH - 50 - step_width
         
-        y = SCREEN_HEIGHT + 20
-        
-        new_step = Step(x, y, step_width, column, step_type)
-        steps.append(new_step)
+        return ScheduledStep(spawn_frame, column, step_width, step_type, x)
+    def pack_rng_state(self):
+        # The RNG only moves when a step is planned, so the packed state
+        # stays valid until the planner moves on. Only choice, random and
+        # randint are drawn, so there is never a pending gaussian to keep.
+        if self.packed_rng is None or self.packed_rng[0] != self.planned_frame:
+            self.packed_rng = (self.planned_frame, SNAPSHOT_RNG.pack(*self.rng.getstate()[1]))
+        return self.packed_rng[1]
+    def unpack_rng_state(self, planned_frame, data):
+        # Moves the planner to planned_frame with the RNG in the packed
+        # state; setstate is skipped when the cache shows it already is
+        if self.packed_rng != (self.planned_frame, data):
+            self.rng.setstate((3, SNAPSHOT_RNG.unpack(data), None))
+        self.planned_frame = planned_frame
+        self.packed_rng = (planned_frame, data)
+    def spawn_step(self, steps, planned):
+        # New steps enter just below the screen
+        steps.spawn(planned.x, steps.camera_y + SCREEN_HEIGHT + 20, planned.width,
+                    planned.column, planned.step_type)
 
 class Plane:
+    __slots__ = ("x", "prev_x", "y", "width", "height", "speed", "active", "player_dropped")
     def __init__(self):
         self.x = -120
+        self.prev_x = self.x
         self.y = 80
         self.width = 80
         self.height = 30
@@ -324,52 +889,440 @@ class Plane:
         self.active = False
         self.player_dropped = False
     def update(self):
+        self.prev_x = self.x
         if self.active:
             self.x += self.speed
     def should_drop_player(self):
         return self.x > SCREEN_WIDTH // 2 - 50 and not self.player_dropped
-    def draw(self, screen):
-        if self.active and self.x < SCREEN_WIDTH + 100:
+    def draw(self, screen, alpha=1.0, scale=1.0):
+        x = self.prev_x + (self.x - self.prev_x) * alpha
+        if self.active and x < SCREEN_WIDTH + 100:
             # Plane body
-            pygame.draw.ellipse(screen, GRAY, (self.x, self.y, self.width, self.height))
+            area = pygame.draw.ellipse(screen, GRAY, scale_rect((x, self.y, self.width, self.height), scale))
             # Wings
-            pygame.draw.rect(screen, GRAY, (self.x + 20, self.y - 8, 40, 8))
-            pygame.draw.rect(screen, GRAY, (self.x + 20, self.y + self.height, 40, 8))
+            area.union_ip(pygame.draw.rect(screen, GRAY, scale_rect((x + 20, self.y - 8, 40, 8), scale)))
+            area.union_ip(pygame.draw.rect(screen, GRAY,
+                                           scale_rect((x + 20, self.y + self.height, 40, 8), scale)))
             # Tail
-            pygame.draw.polygon(screen, GRAY, [
-                (self.x + self.width, self.y + self.height//2),
-                (self.x + self.width + 15, self.y + self.height//2 - 8),
-                (self.x + self.width + 15, self.y + self.height//2 + 8)
-            ])
+            area.union_ip(pygame.draw.polygon(screen, GRAY, [
+                ((x + self.width) * scale, (self.y + self.height//2) * scale),
+                ((x + self.width + 15) * scale, (self.y + self.height//2 - 8) * scale),
+                ((x + self.width + 15) * scale, (self.y + self.height//2 + 8) * scale)
+            ]))
+            return area
+        return None
 
-class Game:
+class BackgroundCache:
+    # Sky gradient (optionally with the side walls) rendered once per
+    # resolution and palette, then blitted each frame
     def __init__(self):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("Working Survival Points Game")
-        self.clock = pygame.time.Clock()
-        self.running = True
+        self.key = None
+        self.layers = {}
+    def invalidate(self):
+        self.key = None
+        self.layers = {}
+    def get(self, screen, walls=False):
+        # Checked field by field so a frame builds no key tuple; palette
+        # colors are module constants, so rebinding one is a new object
+        key = self.key
+        if (key is None or key[0] != screen.get_width() or key[1] != screen.get_height() or
+                key[2] is not LIGHT_BLUE or key[3] is not WHITE or key[4] is not GRAY):
+            self.invalidate()
+            self.key = (screen.get_width(), screen.get_height(), LIGHT_BLUE, WHITE, GRAY)
+        layer = self.layers.get(walls)
+        if layer is None:
+            layer = self.render(screen.get_size(), walls)
+            self.layers[walls] = layer
+        return layer
+    def render(self, size, walls):
+        width, height = size
+        layer = pygame.Surface(size)
+        # Gradient sky
+        for y in range(height):
+            color_ratio = y / height
+            r = int(LIGHT_BLUE[0] * (1 - color_ratio) + WHITE[0] * color_ratio)
+            g = int(LIGHT_BLUE[1] * (1 - color_ratio) + WHITE[1] * color_ratio)
+            b = int(LIGHT_BLUE[2] * (1 - color_ratio) + WHITE[2] * color_ratio)
+            pygame.draw.line(layer, (r, g, b), (0, y), (width, y))
+        if walls:
+            wall = scale_length(50, width / SCREEN_WIDTH)
+            pygame.draw.rect(layer, GRAY, (0, 0, wall, height))
+            pygame.draw.rect(layer, GRAY, (width - wall, 0, wall, height))
+        # Match the display format so the per-frame blit is a plain copy
+        if pygame.display.get_surface() is not None:
+            layer = layer.convert()
+        return layer
+
+class HudRenderer:
+    # Text cache for the HUD: static labels are rendered once and counter
+    # values are composed from a pre-rendered glyph atlas, so a counter box
+    # is only rebuilt when its value actually changes. Fonts load on first
+    # use, so nothing waits on the font module before text is drawn.
+    # Positions are screen coordinates; text and boxes are rendered at
+    # scale for a smaller render surface.
+    def __init__(self, font_size=36, big_font_size=72, scale=1.0):
+        self.font_size = font_size
+        self.big_font_size = big_font_size
+        self.scale = scale
+        self.fonts = {}
+        self.texts = {}
+        self.counters = {}
+        self.banners = {}
+        self.glyph_atlas = None
+        self.glyph_rects = {}
+        self.hits = 0
+        self.misses = 0
+    @property
+    def font(self):
+        return self.load_font(scale_length(self.font_size, self.scale))
+    @property
+    def big_font(self):
+        return self.load_font(scale_length(self.big_font_size, self.scale))
+    def load_font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = pygame.font.Font(None, size)
+            self.fonts[size] = font
+        return font
+    def text(self, text, font, color):
+        key = (text, font, color)
+        surface = self.texts.get(key)
+        if surface is None:
+            self.misses += 1
+            surface = font.render(text, True, color)
+            self.texts[key] = surface
+        else:
+            self.hits += 1
+        return surface
+    def build_glyph_atlas(self):
+        glyphs = [self.font.render(char, True, BLACK) for char in HUD_GLYPHS]
+        width = sum(glyph.get_width() for glyph in glyphs)
+        height = max(glyph.get_height() for glyph in glyphs)
+        self.glyph_atlas = pygame.Surface((width, height), pygame.SRCALPHA)
+        x = 0
+        for char, glyph in zip(HUD_GLYPHS, glyphs):
+            self.glyph_atlas.blit(glyph, (x, 0))
+            self.glyph_rects[char] = pygame.Rect(x, 0, glyph.get_width(), glyph.get_height())
+            x += glyph.get_width()
+    def compose_counter(self, label, value, suffix):
+        if self.glyph_atlas is None:
+            self.build_glyph_atlas()
+        label_surface = self.text(label, self.font, BLACK)
+        suffix_surface = self.text(suffix, self.font, BLACK)
+        digits = str(value)
+        text_width = (label_surface.get_width() + suffix_surface.get_width() +
+                      sum(self.glyph_rects[char].width for char in digits))
+        pad = scale_length(5, self.scale)
+        box = pygame.Surface((text_width + pad * 2, scale_length(35, self.scale)))
+        box.fill(WHITE)
+        pygame.draw.rect(box, BLACK, box.get_rect(), scale_length(2, self.scale))
+        box.blit(label_surface, (pad, pad))
+        x = pad + label_surface.get_width()
+        for char in digits:
+            rect = self.glyph_rects[char]
+            box.blit(self.glyph_atlas, (x, pad), rect)
+            x += rect.width
+        box.blit(suffix_surface, (x, pad))
+        if pygame.display.get_surface() is not None:
+            box = box.convert()
+        return box
+    def draw_counter(self, screen, pos, label, value, suffix=""):
+        cached = self.counters.get(label)
+        if cached is not None and cached[0] == value:
+            self.hits += 1
+            box = cached[1]
+        else:
+            self.misses += 1
+            box = self.compose_counter(label, value, suffix)
+            self.counters[label] = (value, box)
+        return screen.blit(box, (pos[0] * self.scale, pos[1] * self.scale))
+    def draw_banner(self, screen, text, color):
+        banner = self.banners.get((text, color))
+        if banner is None:
+            self.misses += 1
+            text_surface = self.big_font.render(text, True, color)
+            box = pygame.Surface((text_surface.get_width() + scale_length(20, self.scale),
+                                  text_surface.get_height() + scale_length(10, self.scale)))
+            box.fill(WHITE)
+            pygame.draw.rect(box, color, box.get_rect(), scale_length(3, self.scale))
+            banner = (box, text_surface)
+            self.banners[(text, color)] = banner
+        else:
+            self.hits += 1
+        box, text_surface = banner
+        center_x = SCREEN_WIDTH//2 * self.scale
+        area = screen.blit(box, (center_x - box.get_width()//2, 80 * self.scale))
+        area.union_ip(screen.blit(text_surface, text_surface.get_rect(center=(center_x, 90 * self.scale))))
+        return area
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+class DirtyRectTracker:
+    # Collects the regions drawn each frame. Presenting erases and updates
+    # only those regions (plus last frame's, where sprites used to be) and
+    # falls back to a full flip when they cover too much of the screen.
+    def __init__(self, max_fraction=DIRTY_RECT_MAX_FRACTION):
+        self.max_fraction = max_fraction
+        self.rects = []
+        self.previous = []
+        self.full_redraw = True
+    def invalidate(self):
+        self.full_redraw = True
+    def add(self, rect):
+        if rect:
+            self.rects.append(rect)
+    def restore(self, screen, background):
+        if self.full_redraw:
+            screen.blit(background, (0, 0))
+        else:
+            for rect in self.previous:
+                screen.blit(background, rect, rect)
+    def present(self, screen, scale=1.0):
+        # screen is the display surface; scale maps the tracked regions
+        # onto it when they were drawn on a smaller render surface
+        regions = self.previous + self.rects
+        self.previous = self.rects
+        self.rects = []
+        if self.full_redraw:
+            self.full_redraw = False
+            pygame.display.flip()
+            return
+        if scale != 1.0:
+            # Rounded out a pixel so no scaled edge is left behind
+            regions = [scale_rect(rect, scale).inflate(2, 2) for rect in regions]
+        screen_width, screen_height = screen.get_size()
+        area = 0
+        for rect in regions:
+            area += rect.width * rect.height
+        if area > screen_width * screen_height * self.max_fraction:
+            pygame.display.flip()
+        else:
+            pygame.display.update(regions)
+
+class InputRecording:
+    # A game session as its RNG seed plus one byte of buttons per tick, and
+    # a fingerprint of the state it ended in so replays can be verified
+    MAGIC = b"QJR1"
+    HEADER = struct.Struct("<4sQI")
+    FINGERPRINT = struct.Struct("<iiIdddd")
+    def __init__(self, seed):
+        self.seed = seed
+        self.inputs = bytearray()
+        self.final_state = None
+    def record(self, buttons):
+        self.inputs.append(buttons)
+    def finish(self, sim):
+        self.final_state = state_fingerprint(sim)
+    def matches(self, sim):
+        return self.final_state is not None and self.final_state == state_fingerprint(sim)
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.seed, len(self.inputs)))
+            f.write(self.inputs)
+            if self.final_state is not None:
+                f.write(self.final_state)
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, seed, frames = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError(f"{path} is not an input recording")
+        recording = cls(seed)
+        start = cls.HEADER.size
+        recording.inputs = bytearray(data[start:start + frames])
+        final_state = data[start + frames:]
+        if final_state:
+            recording.final_state = final_state
+        return recording
+
+def state_fingerprint(sim):
+    player = sim.player
+    return InputRecording.FINGERPRINT.pack(
+        sim.score, sim.game_time, len(sim.steps),
+        player.x if player else 0.0, player.y if player else 0.0,
+        player.vel_x if player else 0.0, player.vel_y if player else 0.0)
+
+def replay(recording, step_store=None):
+    # Re-run a recorded session headless, as fast as the CPU allows
+    sim = Simulation(step_store or StepIndex, seed=recording.seed,
+                     input_provider=ReplayInput(recording))
+    sim.reset_game()
+    sim.run_frames(len(recording.inputs))
+    return sim
+
+class RewindBuffer:
+    # The last REWIND_SECONDS of "playing" ticks. The game is deterministic,
+    # so a tick's delta is just its input byte: a ring of inputs plus a
+    # snapshot every REWIND_KEYFRAME_INTERVAL ticks is enough to rebuild any
+    # tick, by restoring the keyframe before it and re-running the inputs
+    # in between. Memory is fixed by the sizes: one byte per tick plus
+    # ticks / interval + 1 snapshots. A snapshot is 2656 bytes, plus 22 per
+    # live step (and a held step that scrolled away) and 14 per planned
+    # step, at most 2 * STEP_SCHEDULE_LOOKAHEAD of them. With the ten or so
+    # steps on screen that is about 3 KB, so 10 seconds at 60 ticks per
+    # second takes about 64 KB.
+    # Keyframes are packed into buffers reused from lap to lap.
+    def __init__(self, seconds=REWIND_SECONDS, keyframe_interval=REWIND_KEYFRAME_INTERVAL):
+        self.size = seconds * TICK_RATE
+        self.keyframe_interval = keyframe_interval
+        self.inputs = bytearray(self.size)
+        slots = self.size // keyframe_interval + 1
+        self.keyframes = [bytearray() for _ in range(slots)]
+        self.ticks = 0  # Playing ticks recorded
+        self.first = 0  # Oldest tick whose input is still held
+        self.position = None  # Tick shown while rewound, None when live
+        self.recording_start = None  # Length of the input recording at tick 0
+        self.replay_start = None  # Position of a ReplayInput driving the game at tick 0
+    def record(self, sim, buttons):
+        # Called before each playing tick runs. Playing on from a rewound
+        # position drops the ticks after it, here and in the recording.
+        if self.position is not None:
+            self.ticks = self.position
+            self.position = None
+            if sim.recording is not None:
+                del sim.recording.inputs[self.recording_start + self.ticks:]
+                sim.recording.final_state = None
+        tick = self.ticks
+        if self.recording_start is None:
+            self.recording_start = len(sim.recording.inputs) if sim.recording is not None else 0
+            if isinstance(sim.input, ReplayInput):
+                # This tick's buttons have already been read
+                self.replay_start = sim.input.position - 1
+        if tick % self.keyframe_interval == 0:
+            keyframe = self.keyframes[tick // self.keyframe_interval % len(self.keyframes)]
+            size = sim.snapshot_size()
+            if len(keyframe) < size:
+                keyframe.extend(bytes(size - len(keyframe)))
+            sim.snapshot_into(keyframe)
+        self.inputs[tick % self.size] = buttons
+        self.ticks = tick + 1
+        self.first = max(self.first, self.ticks - self.size)
+    def oldest(self):
+        # Earliest tick that can still be rebuilt: the first keyframe whose
+        # inputs onwards are all held
+        interval = self.keyframe_interval
+        return (self.first + interval - 1) // interval * interval
+    def current(self):
+        return self.ticks if self.position is None else self.position
+    def seek(self, sim, tick):
+        # Puts sim in the state it had just before the given tick ran
+        tick = max(self.oldest(), min(tick, self.ticks))
+        interval = self.keyframe_interval
+        keyframe = tick - tick % interval
+        sim.restore(self.keyframes[keyframe // interval % len(self.keyframes)])
+        for t in range(keyframe, tick):
+            sim.update(self.inputs[t % self.size])
+        self.position = tick
+    def memory_use(self):
+        return len(self.inputs) + sum(len(keyframe) for keyframe in self.keyframes)
+
+class FrameProfiler:
+    # Per-phase timings of the last FRAME_PROFILE_SIZE frames in a flat ring
+    # buffer of doubles. Game.run only times phases while one exists, so
+    # with profiling off the cost is a single check per frame.
+    PHASES = ("events", "update", "draw", "present")
+    def __init__(self, size=FRAME_PROFILE_SIZE):
+        self.size = size
+        self.samples = array("d", bytes(8 * size * len(self.PHASES)))
+        self.frames = 0
+        self.show_overlay = False
+    def record(self, events, update, draw, present):
+        i = (self.frames % self.size) * 4
+        samples = self.samples
+        samples[i] = events
+        samples[i + 1] = update
+        samples[i + 2] = draw
+        samples[i + 3] = present
+        self.frames += 1
+    def recent(self):
+        # Rows of phase timings in seconds, oldest first
+        count = min(self.frames, self.size)
+        first = self.frames - count
+        for frame in range(first, self.frames):
+            i = (frame % self.size) * 4
+            yield frame, self.samples[i:i + 4]
+    def averages(self):
+        count = min(self.frames, self.size)
+        totals = [0.0] * len(self.PHASES)
+        for _, row in self.recent():
+            for phase, value in enumerate(row):
+                totals[phase] += value
+        return [total / count if count else 0.0 for total in totals]
+    def export_csv(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame"] + [f"{phase}_ms" for phase in self.PHASES] + ["total_ms"])
+            for frame, row in self.recent():
+                writer.writerow([frame] + [f"{value * 1000:.3f}" for value in row] +
+                                [f"{sum(row) * 1000:.3f}"])
+
+# Snapshot layout: a header, the plane, the player, the step generator and
+# its RNG, the planned steps, then the live steps in spawn order. Steps the
+# game points at are stored as indexes into the live steps (-1 for none).
+# A grabbed step can scroll away while still held, so one that is no
+# longer live (-2) follows the player as a step record of its own; the
+# landed-on step is -2 too when it is that held step. Step records are in
+# world space; the header holds the camera.
+GAME_STATES = ("start", "intro", "playing", "game_over")
+SNAPSHOT_MAGIC = b"QJS4"
+SNAPSHOT_HEADER = struct.Struct("<4sBiidddiQ?iI")
+SNAPSHOT_PLANE = struct.Struct("<dd??")
+SNAPSHOT_PLAYER = struct.Struct("<?dddddd???BBBi")
+SNAPSHOT_STEP = struct.Struct("<ddiBB")
+SNAPSHOT_GENERATOR = struct.Struct("<dbiiI")
+SNAPSHOT_PLANNED = struct.Struct("<iBiBi")
+SNAPSHOT_RNG = struct.Struct("<625I")
+
+class Simulation:
+    # Pure game logic: no display, font or mixer needed, so it can be
+    # stepped headless as fast as the CPU allows. step_store picks the step
+    # container (StepIndex, or ArrayStepStore for stress runs). A fixed seed
+    # makes every game identical; otherwise each game draws a fresh seed,
+    # kept in game_seed so the session can still be reproduced.
+    # input_provider supplies each tick's buttons for step()/run_frames().
+    # With rewind on, each game keeps a RewindBuffer of its recent play.
+    def __init__(self, step_store=StepIndex, seed=None, record_inputs=False, input_provider=None,
+                 rewind=False):
+        self.step_store = step_store
+        self.input = input_provider if input_provider is not None else NoInput()
+        self.seed = seed
+        self.game_seed = None
+        self.record_inputs = record_inputs
+        self.recording = None
+        self.rewind_enabled = rewind
+        self.rewind = None
         self.game_state = "start"  # start, intro, playing, game_over
         self.score = 0
         self.game_time = 0
-        self.font = pygame.font.Font(None, 36)
-        self.big_font = pygame.font.Font(None, 72)
         
         # Game objects
         self.player = None
         self.plane = Plane()
-        self.steps = []
+        self.steps = step_store()
         self.step_generator = StepGenerator()
         self.step_speed = INITIAL_STEP_SPEED
         self.last_step_landed = None
         self.parachute_timer = 0
+        self.scroll_delta = 0  # How far the steps moved on the last tick
     def reset_game(self):
-        self.steps = []
+        self.steps.clear()
+        self.steps = self.step_store()
         self.score = 0
         self.game_time = 0
         self.step_speed = INITIAL_STEP_SPEED
-        self.step_generator = StepGenerator()
+        # Snapshots and recordings store the seed as an unsigned 64-bit
+        # integer, so any int is folded into that range first
+        self.game_seed = self.seed % 2**64 if self.seed is not None else random.getrandbits(64)
+        self.step_generator = StepGenerator(random.Random(self.game_seed))
         self.last_step_landed = None
         self.parachute_timer = 0
+        self.scroll_delta = 0
+        self.recording = InputRecording(self.game_seed) if self.record_inputs else None
+        self.rewind = RewindBuffer() if self.rewind_enabled else None
         
         # Start intro sequence
         self.game_state = "intro"
@@ -379,24 +1332,17 @@ class Game:
         self.player = None
         
         # Create initial large landing platform
-        initial_step = Step(SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT - 120, 200, 1, "easy")
-        self.steps.append(initial_step)
-    def handle_events(self):
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.running = False
-            elif event.type == pygame.KEYDOWN:
-                if self.game_state == "start" and event.key == pygame.K_SPACE:
-                    self.reset_game()
-                elif self.game_state == "game_over" and event.key == pygame.K_SPACE:
-                    self.game_state = "start"
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if self.game_state == "start":
-                    mouse_x, mouse_y = pygame.mouse.get_pos()
-                    button_rect = pygame.Rect(SCREEN_WIDTH//2 - 100, SCREEN_HEIGHT//2, 200, 50)
-                    if button_rect.collidepoint(mouse_x, mouse_y):
-                        self.reset_game()
-    def update(self):
+        self.steps.spawn(SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT - 120, 200, 1, "easy")
+    def update(self, buttons=0):
+        if self.rewind is not None and self.game_state == "playing":
+            self.rewind.record(self, buttons)
+        if self.player:
+            self.player.remember_position()
+        scrolled = self.scroll_delta
+        self.scroll_delta = 0
+        if self.recording is not None and self.game_state in ["intro", "playing"]:
+            self.recording.record(buttons)
+        
         if self.game_state == "intro":
             self.plane.update()
             
@@ -418,9 +1364,10 @@ class Game:
                         self.player.x += (target_x - self.player.x) * 0.1
                 else:
                     # Land on platform and start game
+                    camera_y = self.steps.camera_y
                     for step in self.steps:
-                        if step.y > SCREEN_HEIGHT - 150:
-                            self.player.y = step.y - self.player.height
+                        if step.y - camera_y > SCREEN_HEIGHT - 150:
+                            self.player.y = step.y - camera_y - self.player.height
                             self.player.x = step.x + step.width/2 - self.player.width/2
                             self.player.on_ground = True
                             self.player.vel_y = 0
@@ -435,45 +1382,290 @@ class Game:
             self.step_speed = INITIAL_STEP_SPEED + (MAX_STEP_SPEED - INITIAL_STEP_SPEED) * time_factor
             
             # Update player
-            landed_step = self.player.update(self.steps)
+            landed_step = self.player.update(self.steps, buttons, scrolled)
             if landed_step and landed_step != self.last_step_landed:
                 self.score += 1
                 self.last_step_landed = landed_step
             
             # Update steps
-            for step in self.steps[:]:
-                step.update(self.step_speed)
-                if step.y < -step.height:
-                    self.steps.remove(step)
+            self.scroll_delta = self.step_speed
+            if self.steps.scroll(self.step_speed):
+                self.forget_culled_steps()
             
             # Generate new steps
             self.step_generator.update(self.steps, self.game_time)
             
             # Check game over
             if self.player.y > SCREEN_HEIGHT:
-                self.game_state = "game_over"
+                self.game_over()
+    def forget_culled_steps(self):
+        # Despawned steps are reused by later spawns, so nothing may keep
+        # pointing at one. A landed-on step that is gone can never match a
+        # live one, so it is dropped. A grabbed step that scrolled away is
+        # still climbed onto, so the player keeps a copy of it.
+        top = self.steps.camera_y - STEP_HEIGHT
+        landed = self.last_step_landed
+        if landed is not None and landed.y < top:
+            self.last_step_landed = None
+        player = self.player
+        grab_step = player.grab_step
+        if grab_step is not None and grab_step.y < top:
+            player.grab_step = Step(grab_step.x, grab_step.y, grab_step.width,
+                                    grab_step.column, grab_step.step_type)
+            if grab_step is landed:
+                self.last_step_landed = player.grab_step
+    def game_over(self):
+        self.game_state = "game_over"
+        if self.recording is not None:
+            self.recording.finish(self)
+    def snapshot(self):
+        # Whole game state as compact bytes for restore(); the step store,
+        # seed setting, input provider and recording are not included
+        data = bytearray(self.snapshot_size())
+        self.snapshot_into(data)
+        return bytes(data)
+    def snapshot_size(self):
+        size = (SNAPSHOT_HEADER.size + SNAPSHOT_PLANE.size + SNAPSHOT_PLAYER.size +
+                SNAPSHOT_GENERATOR.size + SNAPSHOT_RNG.size +
+                len(self.step_generator.upcoming) * SNAPSHOT_PLANNED.size +
+                len(self.steps) * SNAPSHOT_STEP.size)
+        player = self.player
+        if player is not None and player.grab_step is not None and self.step_row(player.grab_step) < 0:
+            size += SNAPSHOT_STEP.size
+        return size
+    def step_row(self, step):
+        # Spawn-order index of a live step, -1 if it is not live
+        row = 0
+        for live in self.steps:
+            if live is step:
+                return row
+            row += 1
+        return -1
+    def landed_row(self):
+        # step_row() of the landed-on step, or -2 when it has scrolled away
+        # and survives only as the step the player is still holding
+        landed = self.last_step_landed
+        row = self.step_row(landed)
+        player = self.player
+        if (row < 0 and landed is not None and player is not None and
+                landed is player.grab_step):
+            return -2
+        return row
+    def snapshot_into(self, buffer):
+        # Packs a snapshot into buffer, which must hold snapshot_size()
+        # bytes, so repeated snapshots can reuse one buffer
+        generator = self.step_generator
+        SNAPSHOT_HEADER.pack_into(
+            buffer, 0, SNAPSHOT_MAGIC, GAME_STATES.index(self.game_state), self.score,
+            self.game_time, self.step_speed, self.scroll_delta, self.steps.camera_y,
+            self.parachute_timer, self.game_seed if self.game_seed is not None else 0,
+            self.game_seed is not None, self.landed_row(), len(self.steps))
+        offset = SNAPSHOT_HEADER.size
+        plane = self.plane
+        SNAPSHOT_PLANE.pack_into(buffer, offset, plane.x, plane.prev_x, plane.active, plane.player_dropped)
+        offset += SNAPSHOT_PLANE.size
+        player = self.player
+        if player is None:
+            SNAPSHOT_PLAYER.pack_into(buffer, offset, False, 0, 0, 0, 0, 0, 0,
+                                      False, False, False, 0, 0, 0, -1)
+            offset += SNAPSHOT_PLAYER.size
+        else:
+            grab_step = player.grab_step
+            grab = -1 if grab_step is None else self.step_row(grab_step)
+            if grab_step is not None and grab < 0:
+                grab = -2
+            SNAPSHOT_PLAYER.pack_into(
+                buffer, offset, True, player.x, player.y, player.prev_x, player.prev_y,
+                player.vel_x, player.vel_y, player.on_ground, player.grabbing, player.facing_right,
+                player.animation_frame, player.animation_timer, PLAYER_STATES.index(player.state), grab)
+            offset += SNAPSHOT_PLAYER.size
+            if grab == -2:
+                SNAPSHOT_STEP.pack_into(buffer, offset, grab_step.x, grab_step.y, grab_step.width,
+                                        grab_step.column, STEP_TYPES.index(grab_step.step_type))
+                offset += SNAPSHOT_STEP.size
+        SNAPSHOT_GENERATOR.pack_into(buffer, offset, generator.difficulty, generator.last_column,
+                                     generator.planned_frame, generator.spawn_timer,
+                                     len(generator.upcoming))
+        offset += SNAPSHOT_GENERATOR.size
+        buffer[offset:offset + SNAPSHOT_RNG.size] = generator.pack_rng_state()
+        offset += SNAPSHOT_RNG.size
+        for planned in generator.upcoming:
+            SNAPSHOT_PLANNED.pack_into(buffer, offset, planned.spawn_frame, planned.column, planned.width,
+                                       STEP_TYPES.index(planned.step_type), planned.x)
+            offset += SNAPSHOT_PLANNED.size
+        for step in self.steps:
+            SNAPSHOT_STEP.pack_into(buffer, offset, step.x, step.y, step.width, step.column,
+                                    STEP_TYPES.index(step.step_type))
+            offset += SNAPSHOT_STEP.size
+        return offset
+    def restore(self, data):
+        # The header is checked before anything is assigned, so a rejected
+        # buffer leaves the game as it was
+        (magic, game_state, score, game_time, step_speed, scroll_delta, camera_y,
+         parachute_timer, game_seed, has_seed, landed, step_count) = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("not a game snapshot")
+        if game_state >= len(GAME_STATES):
+            raise ValueError(f"snapshot has unknown game state {game_state}")
+        self.game_state = GAME_STATES[game_state]
+        self.score, self.game_time, self.step_speed = score, game_time, step_speed
+        self.scroll_delta, self.parachute_timer = scroll_delta, parachute_timer
+        self.game_seed = game_seed if has_seed else None
+        offset = SNAPSHOT_HEADER.size
+        
+        plane = self.plane = Plane()
+        plane.x, plane.prev_x, plane.active, plane.player_dropped = SNAPSHOT_PLANE.unpack_from(data, offset)
+        offset += SNAPSHOT_PLANE.size
+        
+        (has_player, x, y, prev_x, prev_y, vel_x, vel_y, on_ground, grabbing, facing_right,
+         animation_frame, animation_timer, state, grab) = SNAPSHOT_PLAYER.unpack_from(data, offset)
+        offset += SNAPSHOT_PLAYER.size
+        player = None
+        if has_player:
+            player = Player(x, y)
+            player.prev_x, player.prev_y = prev_x, prev_y
+            player.vel_x, player.vel_y = vel_x, vel_y
+            player.on_ground, player.grabbing, player.facing_right = on_ground, grabbing, facing_right
+            player.animation_frame, player.animation_timer = animation_frame, animation_timer
+            player.state = PLAYER_STATES[state]
+            if grab == -2:
+                step_x, step_y, width, column, step_type = SNAPSHOT_STEP.unpack_from(data, offset)
+                offset += SNAPSHOT_STEP.size
+                player.grab_step = Step(step_x, step_y, width, column, STEP_TYPES[step_type])
+        self.player = player
+        
+        generator = self.step_generator
+        (generator.difficulty, generator.last_column, planned_frame,
+         generator.spawn_timer, upcoming) = SNAPSHOT_GENERATOR.unpack_from(data, offset)
+        offset += SNAPSHOT_GENERATOR.size
+        generator.unpack_rng_state(planned_frame, data[offset:offset + SNAPSHOT_RNG.size])
+        offset += SNAPSHOT_RNG.size
+        generator.upcoming.clear()
+        for _ in range(upcoming):
+            spawn_frame, column, width, step_type, x = SNAPSHOT_PLANNED.unpack_from(data, offset)
+            offset += SNAPSHOT_PLANNED.size
+            generator.upcoming.append(ScheduledStep(spawn_frame, column, width, STEP_TYPES[step_type], x))
+        
+        self.steps.clear()
+        steps = self.steps = self.step_store()
+        steps.camera_y = camera_y
+        restored = []
+        for _ in range(step_count):
+            step_x, step_y, width, column, step_type = SNAPSHOT_STEP.unpack_from(data, offset)
+            offset += SNAPSHOT_STEP.size
+            restored.append(steps.spawn(step_x, step_y, width, column, STEP_TYPES[step_type]))
+        self.last_step_landed = restored[landed] if landed >= 0 else None
+        if landed == -2:
+            self.last_step_landed = player.grab_step
+        if player is not None and grab >= 0:
+            player.grab_step = restored[grab]
+    def rewind_to(self, tick):
+        # Show the state from just before the given playing tick; the next
+        # tick played carries on from there
+        rewind, recording = self.rewind, self.recording
+        self.rewind = self.recording = None  # The re-run ticks are not new play
+        rewind.seek(self, tick)
+        self.rewind, self.recording = rewind, recording
+        if rewind.replay_start is not None:
+            # A watched replay reads the rewound ticks again
+            self.input.position = rewind.replay_start + rewind.position
+    def step(self):
+        # One tick driven by the input provider
+        self.update(self.input.read(self))
+    def run_frames(self, frames):
+        # Step the simulation headless; stops early once the game is over
+        for _ in range(frames):
+            self.update(self.input.read(self))
+            if self.game_state == "game_over":
+                break
+
+class Game(Simulation):
+    def __init__(self, dirty_rects=False, step_store=StepIndex, seed=None, record_path=None,
+                 profile=False, profile_csv=None, input_provider=None, rewind=True,
+                 render_scale=1.0, scaled_window=False):
+        # Only the display is started up front: nothing plays sound, so the
+        # mixer is never opened, and fonts load when text is first drawn
+        pygame.display.init()
+        # Frames are drawn on self.screen, render_scale times the size of
+        # the game area, and shown in self.window. Below 1.0 far fewer
+        # pixels are filled: the frame is either stretched over a full-size
+        # window with pygame.transform.scale, or with scaled_window the
+        # small surface is the display and SDL scales it (pygame.SCALED).
+        if render_scale <= 0:
+            raise ValueError("render_scale must be positive")
+        self.render_scale = render_scale
+        render_size = (scale_length(SCREEN_WIDTH, render_scale), scale_length(SCREEN_HEIGHT, render_scale))
+        if scaled_window:
+            self.window = self.screen = pygame.display.set_mode(render_size, pygame.SCALED)
+        else:
+            self.window = self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            if render_scale != 1.0:
+                self.screen = pygame.Surface(render_size).convert()
+        pygame.display.set_caption("Working Survival Points Game")
+        self.clock = pygame.time.Clock()
+        self.running = True
+        self.background = BackgroundCache()
+        self.hud = HudRenderer(scale=render_scale)
+        self.dirty_rects = DirtyRectTracker() if dirty_rects else None
+        self.render_alpha = 1.0  # Fraction of a tick elapsed since the last update
+        self.record_path = record_path
+        self.profiler = FrameProfiler() if profile or profile_csv else None
+        self.profile_csv = profile_csv
+        self.rewinding = False  # Rewind key held
+        super().__init__(step_store, seed, record_inputs=record_path is not None,
+                         input_provider=input_provider if input_provider is not None else KeyboardInput(),
+                         rewind=rewind)
+    @property
+    def font(self):
+        return self.hud.font
+    @property
+    def big_font(self):
+        return self.hud.big_font
+    def handle_events(self):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3:
+                    self.toggle_profile_overlay()
+                elif event.key == pygame.K_r and self.can_rewind():
+                    self.rewinding = True
+                elif self.game_state == "start" and event.key == pygame.K_SPACE:
+                    self.reset_game()
+                elif self.game_state == "game_over" and event.key == pygame.K_SPACE:
+                    self.game_state = "start"
+            elif event.type == pygame.KEYUP:
+                if event.key == pygame.K_r:
+                    # Play resumes from whichever tick is on screen
+                    self.rewinding = False
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if self.game_state == "start":
+                    mouse_x, mouse_y = pygame.mouse.get_pos()
+                    if self.window is self.screen:
+                        # The pointer comes in display surface pixels
+                        mouse_x /= self.render_scale
+                        mouse_y /= self.render_scale
+                    button_rect = pygame.Rect(SCREEN_WIDTH//2 - 100, SCREEN_HEIGHT//2, 200, 50)
+                    if button_rect.collidepoint(mouse_x, mouse_y):
+                        self.reset_game()
     def draw_background(self):
-        # Gradient sky
-        for y in range(SCREEN_HEIGHT):
-            color_ratio = y / SCREEN_HEIGHT
-            r = int(LIGHT_BLUE[0] * (1 - color_ratio) + WHITE[0] * color_ratio)
-            g = int(LIGHT_BLUE[1] * (1 - color_ratio) + WHITE[1] * color_ratio)
-            b = int(LIGHT_BLUE[2] * (1 - color_ratio) + WHITE[2] * color_ratio)
-            pygame.draw.line(self.screen, (r, g, b), (0, y), (SCREEN_WIDTH, y))
+        self.screen.blit(self.background.get(self.screen), (0, 0))
     def draw_start_screen(self):
         self.draw_background()
         
+        scale = self.render_scale
+        
         # Title
-        title_text = self.big_font.render("Q JUMP", True, BLACK)
-        title_rect = title_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 100))
+        title_text = self.hud.text("Q JUMP", self.big_font, BLACK)
+        title_rect = title_text.get_rect(center=(SCREEN_WIDTH//2 * scale, (SCREEN_HEIGHT//2 - 100) * scale))
         self.screen.blit(title_text, title_rect)
         
         # Start button
-        button_rect = pygame.Rect(SCREEN_WIDTH//2 - 100, SCREEN_HEIGHT//2, 200, 50)
+        button_rect = scale_rect((SCREEN_WIDTH//2 - 100, SCREEN_HEIGHT//2, 200, 50), scale)
         pygame.draw.rect(self.screen, GREEN, button_rect)
-        pygame.draw.rect(self.screen, BLACK, button_rect, 3)
+        pygame.draw.rect(self.screen, BLACK, button_rect, scale_length(3, scale))
         
-        button_text = self.font.render("Start Game", True, BLACK)
+        button_text = self.hud.text("Start Game", self.font, BLACK)
         button_text_rect = button_text.get_rect(center=button_rect.center)
         self.screen.blit(button_text, button_text_rect)
         
@@ -482,25 +1674,28 @@ class Game:
             "🎮 Arrow keys: Move and jump",
             "🤏 Get close to steps to grab automatically",
             "⬆️ UP key: Climb onto grabbed steps",
+            "⏪ Hold R: Rewind the last 10 seconds",
             "🎯 Starts easy (90% large steps), gets harder!",
             "🏆 Survive as long as possible!"
         ]
         
         for i, instruction in enumerate(instructions):
-            text = self.font.render(instruction, True, BLACK)
-            text_rect = text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 100 + i * 35))
+            text = self.hud.text(instruction, self.font, BLACK)
+            text_rect = text.get_rect(center=(SCREEN_WIDTH//2 * scale, (SCREEN_HEIGHT//2 + 100 + i * 35) * scale))
             self.screen.blit(text, text_rect)
     def draw_game_over_screen(self):
         self.draw_background()
+        scale = self.render_scale
+        center_x = SCREEN_WIDTH//2 * scale
         
         # Game Over
-        game_over_text = self.big_font.render("Game Over", True, RED)
-        game_over_rect = game_over_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 50))
+        game_over_text = self.hud.text("Game Over", self.big_font, RED)
+        game_over_rect = game_over_text.get_rect(center=(center_x, (SCREEN_HEIGHT//2 - 50) * scale))
         self.screen.blit(game_over_text, game_over_rect)
         
         # Score
-        score_text = self.font.render(f"Final Score: {self.score} steps", True, BLACK)
-        score_rect = score_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
+        score_text = self.hud.text(f"Final Score: {self.score} steps", self.font, BLACK)
+        score_rect = score_text.get_rect(center=(center_x, SCREEN_HEIGHT//2 * scale))
         self.screen.blit(score_text, score_rect)
         
         # Performance message
@@ -513,94 +1708,232 @@ class Game:
         else:
             perf_msg = "💪 Keep trying! You'll improve!"
             
-        perf_text = self.font.render(perf_msg, True, BLUE)
-        perf_rect = perf_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 40))
+        perf_text = self.hud.text(perf_msg, self.font, BLUE)
+        perf_rect = perf_text.get_rect(center=(center_x, (SCREEN_HEIGHT//2 + 40) * scale))
         self.screen.blit(perf_text, perf_rect)
         
         # Restart
-        restart_text = self.font.render("Press SPACE to return to menu", True, BLACK)
-        restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 80))
+        restart_text = self.hud.text("Press SPACE to return to menu", self.font, BLACK)
+        restart_rect = restart_text.get_rect(center=(center_x, (SCREEN_HEIGHT//2 + 80) * scale))
         self.screen.blit(restart_text, restart_rect)
+    def game_over(self):
+        super().game_over()
+        if self.record_path is not None and self.recording is not None:
+            self.recording.save(self.record_path)
+    def can_rewind(self):
+        return (self.rewind is not None and self.rewind.ticks > 0 and
+                self.game_state in ["playing", "game_over"])
+    def step(self):
+        if self.rewinding and self.can_rewind():
+            self.scrub_rewind()
+        else:
+            super().step()
+    def scrub_rewind(self):
+        rewind = self.rewind
+        position = rewind.current()
+        target = max(rewind.oldest(), position - REWIND_SCRUB_SPEED)
+        if target < position:
+            self.rewind_to(target)
+    def restore(self, data):
+        super().restore(data)
+        if self.dirty_rects is not None:
+            self.dirty_rects.invalidate()
+    def mark_dirty(self, rect):
+        if self.dirty_rects is not None:
+            self.dirty_rects.add(rect)
     def draw_game(self):
-        self.draw_background()
+        # Sky and walls come pre-rendered from one cached layer
+        background = self.background.get(self.screen, walls=True)
+        if self.dirty_rects is not None:
+            self.dirty_rects.restore(self.screen, background)
+        else:
+            self.screen.blit(background, (0, 0))
         
-        # Draw walls
-        pygame.draw.rect(self.screen, GRAY, (0, 0, 50, SCREEN_HEIGHT))
-        pygame.draw.rect(self.screen, GRAY, (SCREEN_WIDTH - 50, 0, 50, SCREEN_HEIGHT))
+        # Interpolate between the last two ticks: the camera is drawn
+        # partway through its last scroll, and that one offset takes every
+        # step from world to screen space
+        alpha = self.render_alpha
+        step_offset = self.scroll_delta * (1 - alpha) - self.steps.camera_y
+        scale = self.render_scale
         
         # Draw steps
         for step in self.steps:
-            step.draw(self.screen)
+            self.mark_dirty(step.draw(self.screen, step_offset, scale))
         
         # Draw plane during intro
         if self.game_state == "intro":
-            self.plane.draw(self.screen)
+            self.mark_dirty(self.plane.draw(self.screen, alpha, scale))
             
             # Draw parachute
             if self.player and self.parachute_timer > 0:
-                parachute_x = self.player.x + self.player.width//2
-                parachute_y = self.player.y - 40
-                pygame.draw.arc(self.screen, RED, (parachute_x - 25, parachute_y, 50, 30), 0, math.pi, 4)
+                player_x, player_y = self.player.render_position(alpha)
+                parachute_x = player_x + self.player.width//2
+                parachute_y = player_y - 40
+                canopy = scale_rect((parachute_x - 25, parachute_y, 50, 30), scale)
+                area = pygame.draw.arc(self.screen, RED, canopy, 0, math.pi, scale_length(4, scale))
                 # Parachute lines
-                pygame.draw.line(self.screen, BLACK, (parachute_x - 20, parachute_y + 15), 
-                               (self.player.x + 5, self.player.y), 2)
-                pygame.draw.line(self.screen, BLACK, (parachute_x + 20, parachute_y + 15), 
-                               (self.player.x + self.player.width - 5, self.player.y), 2)
+                area.union_ip(pygame.draw.line(self.screen, BLACK,
+                               ((parachute_x - 20) * scale, (parachute_y + 15) * scale),
+                               ((player_x + 5) * scale, player_y * scale), scale_length(2, scale)))
+                area.union_ip(pygame.draw.line(self.screen, BLACK,
+                               ((parachute_x + 20) * scale, (parachute_y + 15) * scale),
+                               ((player_x + self.player.width - 5) * scale, player_y * scale),
+                               scale_length(2, scale)))
+                self.mark_dirty(area)
         
         # Draw player
         if self.player:
-            self.player.draw(self.screen)
+            self.mark_dirty(self.player.draw(self.screen, alpha, scale))
         
         # UI
-        score_text = self.font.render(f"Score: {self.score}", True, BLACK)
-        score_bg = pygame.Rect(5, 5, score_text.get_width() + 10, 35)
-        pygame.draw.rect(self.screen, WHITE, score_bg)
-        pygame.draw.rect(self.screen, BLACK, score_bg, 2)
-        self.screen.blit(score_text, (10, 10))
-        
-        speed_text = self.font.render(f"Speed: {self.step_speed:.1f}x", True, BLACK)
-        speed_bg = pygame.Rect(5, 45, speed_text.get_width() + 10, 35)
-        pygame.draw.rect(self.screen, WHITE, speed_bg)
-        pygame.draw.rect(self.screen, BLACK, speed_bg, 2)
-        self.screen.blit(speed_text, (10, 50))
+        self.mark_dirty(self.hud.draw_counter(self.screen, (5, 5), "Score: ", self.score))
+        self.mark_dirty(self.hud.draw_counter(self.screen, (5, 45), "Speed: ", round(self.step_speed, 1), "x"))
         
         # Difficulty indicator
         difficulty = int(self.step_generator.difficulty)
-        diff_text = self.font.render(f"Difficulty: {difficulty}/3", True, BLACK)
-        diff_bg = pygame.Rect(5, 85, diff_text.get_width() + 10, 35)
-        pygame.draw.rect(self.screen, WHITE, diff_bg)
-        pygame.draw.rect(self.screen, BLACK, diff_bg, 2)
-        self.screen.blit(diff_text, (10, 90))
+        self.mark_dirty(self.hud.draw_counter(self.screen, (5, 85), "Difficulty: ", difficulty, "/3"))
         
         # Grabbing instruction
-        if self.player and self.player.grabbing:
-            grab_text = self.big_font.render("Press UP to climb!", True, RED)
-            grab_bg = pygame.Rect(SCREEN_WIDTH//2 - grab_text.get_width()//2 - 10, 80, 
-                                grab_text.get_width() + 20, grab_text.get_height() + 10)
-            pygame.draw.rect(self.screen, WHITE, grab_bg)
-            pygame.draw.rect(self.screen, RED, grab_bg, 3)
-            grab_rect = grab_text.get_rect(center=(SCREEN_WIDTH//2, 90))
-            self.screen.blit(grab_text, grab_rect)
+        if self.rewinding:
+            self.mark_dirty(self.hud.draw_banner(self.screen, "<< Rewind", BLUE))
+        elif self.player and self.player.grabbing:
+            self.mark_dirty(self.hud.draw_banner(self.screen, "Press UP to climb!", RED))
+    def toggle_profile_overlay(self):
+        # The overlay needs timings, so showing it switches profiling on
+        if self.profiler is None:
+            self.profiler = FrameProfiler()
+        self.profiler.show_overlay = not self.profiler.show_overlay
+    def draw_profile_overlay(self):
+        averages = self.profiler.averages()
+        for i, phase in enumerate(FrameProfiler.PHASES):
+            label = f"{phase} ms: "
+            value = round(averages[i] * 1000, 2)
+            self.mark_dirty(self.hud.draw_counter(self.screen, (SCREEN_WIDTH - 240, 5 + i * 40), label, value))
     def draw(self):
+        self.render()
+        self.present()
+    def render(self):
         if self.game_state == "start":
             self.draw_start_screen()
         elif self.game_state in ["intro", "playing"]:
             self.draw_game()
         elif self.game_state == "game_over":
             self.draw_game_over_screen()
-        
-        pygame.display.flip()
+        if self.profiler is not None and self.profiler.show_overlay:
+            self.draw_profile_overlay()
+    def present(self):
+        window = self.window
+        if self.screen is not window:
+            # Stretch the low-resolution frame over the whole window
+            pygame.transform.scale(self.screen, window.get_size(), window)
+        if self.dirty_rects is None:
+            pygame.display.flip()
+        elif self.game_state in ["intro", "playing"]:
+            self.dirty_rects.present(window, window.get_width() / self.screen.get_width())
+        else:
+            # Menus redraw everything; the next game frame starts from scratch
+            self.dirty_rects.invalidate()
+            pygame.display.flip()
     
     def run(self):
+        # Fixed-timestep loop: the simulation advances in whole ticks of
+        # 1/TICK_RATE seconds however long frames take, and rendering
+        # interpolates between the last two ticks
+        tick_length = 1.0 / TICK_RATE
+        accumulator = 0.0
+        previous_time = time.perf_counter()
         while self.running:
+            now = time.perf_counter()
+            accumulator += now - previous_time
+            previous_time = now
+            
+            profiler = self.profiler
+            if profiler is not None:
+                phase_start = time.perf_counter()
+            
             self.handle_events()
-            self.update()
-            self.draw()
+            if profiler is not None:
+                events_done = time.perf_counter()
+            
+            ticks = 0
+            while accumulator >= tick_length and ticks < MAX_CATCHUP_TICKS:
+                self.step()
+                accumulator -= tick_length
+                ticks += 1
+            if accumulator >= tick_length:
+                # Too far behind to catch up: drop the backlog rather than
+                # spending ever longer frames on simulation
+                accumulator = 0.0
+            if profiler is not None:
+                update_done = time.perf_counter()
+            
+            self.render_alpha = accumulator / tick_length
+            self.render()
+            if profiler is not None:
+                draw_done = time.perf_counter()
+            self.present()
+            if profiler is not None:
+                present_done = time.perf_counter()
+                profiler.record(events_done - phase_start, update_done - events_done,
+                                draw_done - update_done, present_done - draw_done)
             self.clock.tick(FPS)
         
+        if self.profiler is not None and self.profile_csv:
+            self.profiler.export_csv(self.profile_csv)
         pygame.quit()
         sys.exit()
 
-if __name__ == "__main__":
-    game = Game()
+def seed_argument(value):
+    # Seeds are stored as unsigned 64-bit integers in recordings
+    try:
+        seed = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"seed must be an integer, not {value!r}")
+    if not 0 <= seed < 2**64:
+        raise argparse.ArgumentTypeError(f"seed must be between 0 and {2**64 - 1}")
+    return seed
+
+def main():
+    parser = argparse.ArgumentParser(description="Q JUMP survival climbing game")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="only push changed screen regions to the display")
+    parser.add_argument("--seed", type=seed_argument, help="play every game with this RNG seed")
+    parser.add_argument("--record", metavar="PATH", help="save each game's inputs to PATH on game over")
+    parser.add_argument("--profile", action="store_true",
+                        help="time each frame phase from the start (F3 toggles the overlay)")
+    parser.add_argument("--profile-csv", metavar="PATH",
+                        help="write the recent frame-phase timings to PATH on exit")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="replay a recording headless and check it ends in the recorded state")
+    parser.add_argument("--watch", action="store_true",
+                        help="with --replay, play the recording back on screen instead")
+    parser.add_argument("--render-scale", type=float, default=1.0, metavar="SCALE",
+                        help="draw frames at SCALE times the window resolution and stretch them to fit")
+    parser.add_argument("--scaled-window", action="store_true",
+                        help="let SDL stretch the frames (pygame.SCALED) instead of pygame.transform.scale")
+    args = parser.parse_args()
+    
+    if args.replay and args.watch:
+        recording = InputRecording.load(args.replay)
+        game = Game(dirty_rects=args.dirty_rects, seed=recording.seed,
+                    input_provider=ReplayInput(recording),
+                    render_scale=args.render_scale, scaled_window=args.scaled_window)
+        game.reset_game()
+        game.run()
+    elif args.replay:
+        recording = InputRecording.load(args.replay)
+        sim = replay(recording)
+        print(f"Replayed {len(recording.inputs)} frames: score {sim.score}, state {sim.game_state}")
+        if not recording.matches(sim):
+            print("Replay does not match the recorded final state")
+            sys.exit(1)
+        print("Replay matches the recorded final state")
+        return
+    
+    game = Game(dirty_rects=args.dirty_rects, seed=args.seed, record_path=args.record,
+                profile=args.profile, profile_csv=args.profile_csv,
+                render_scale=args.render_scale, scaled_window=args.scaled_window)
     game.run()
+
+if __name__ == "__main__":
+    main()